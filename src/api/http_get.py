@@ -1,17 +1,179 @@
-import requests
+from dataclasses import dataclass, field
+from typing import Iterable, Optional, Self
+import logging
+import random
+import re
+import time
 import asyncio
+import aiohttp
 
 
 JSON = str | int | float | bool | None | dict[str, 'JSON'] | list['JSON']
 
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
 
-def http_get_sync(url: str) -> JSON:
-    with requests.Session() as session:
-        response = session.get(url, timeout=None)
-        response.raise_for_status()
-        return response.json()
-    
 
-async def http_get(url: str) -> JSON:
-    return await asyncio.to_thread(http_get_sync, url)
+def redact_url(url: str) -> str:
+    """Hide api key in url before it gets logged."""
+    return re.sub(r'apikey=[^&]*', 'apikey=***', url)
 
+
+class HttpRequestError(Exception):
+    """Request failed permanently or ran out of retries."""
+
+
+class RateLimiter:
+    """Spreads requests evenly to keep within requests per minute budget."""
+
+    def __init__(self, requests_per_minute: int) -> None:
+        self.interval = 60 / requests_per_minute
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        """Wait for the next free request slot."""
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+@dataclass
+class RequestsSummary:
+    """Outcome of all requests made by the client."""
+    succeeded: int = 0
+    retried: dict[str, int] = field(default_factory=dict)
+    failed: dict[str, str] = field(default_factory=dict)
+
+    def log(self) -> None:
+        """Report retried and failed urls."""
+        logging.info(
+            f'requests succeeded: {self.succeeded}, '
+            f'retried: {len(self.retried)}, failed: {len(self.failed)}'
+        )
+        for url, retries in self.retried.items():
+            logging.info(f'retried {retries}x: {url}')
+        for url, reason in self.failed.items():
+            logging.warning(f'failed ({reason}): {url}')
+
+
+class HttpClient:
+    """
+    Async http client sharing keep-alive connections pool
+    between requests. Retries 429/5xx responses and connection errors
+    with exponential backoff and jitter. To be used as async context manager.
+    """
+
+    def __init__(
+            self,
+            max_connections: int = 10,
+            max_connections_per_host: int = 10,
+            timeout: float = 30,
+            max_retries: int = 5,
+            backoff_base: float = 1,
+            backoff_max: float = 60,
+            requests_per_minute: Optional[int] = None
+        ) -> None:
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limiter = (
+            RateLimiter(requests_per_minute) if requests_per_minute else None
+        )
+        self.summary = RequestsSummary()
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @classmethod
+    def from_config(cls, collect_config: dict[str, int | float]) -> Self:
+        """Create client from [collect] section of config.toml."""
+        return cls(
+            max_connections=collect_config['max_concurrent_requests'],
+            max_connections_per_host=(
+                collect_config['max_connections_per_host']
+            ),
+            timeout=collect_config['request_timeout'],
+            max_retries=collect_config['max_retries'],
+            requests_per_minute=collect_config['requests_per_minute'],
+        )
+
+    async def __aenter__(self) -> Self:
+        connector = aiohttp.TCPConnector(
+            limit=self.max_connections,
+            limit_per_host=self.max_connections_per_host,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self._session.close()
+        self._session = None
+
+    def _backoff_delay(
+            self, attempt: int, retry_after: Optional[str] = None
+        ) -> float:
+        """Exponential backoff with full jitter (honors Retry-After)."""
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_max)
+        return random.uniform(
+            0, min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        )
+
+    async def get(self, url: str) -> JSON:
+        """Get json data, retrying transient failures."""
+        redacted_url = redact_url(url)
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter:
+                await self.rate_limiter.wait()
+            retry_after = None
+            try:
+                async with self._session.get(url) as response:
+                    if response.status in RETRY_STATUSES:
+                        reason = f'status {response.status}'
+                        retry_after = response.headers.get('Retry-After')
+                    elif response.status >= 400:
+                        reason = f'status {response.status}'
+                        self.summary.failed[redacted_url] = reason
+                        raise HttpRequestError(f'{reason}: {redacted_url}')
+                    else:
+                        try:
+                            data = await response.json(content_type=None)
+                        except ValueError as e:
+                            reason = f'invalid json ({e})'
+                            self.summary.failed[redacted_url] = reason
+                            raise HttpRequestError(f'{reason}: {redacted_url}')
+                        self.summary.succeeded += 1
+                        return data
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                reason = type(e).__name__
+
+            if attempt < self.max_retries:
+                self.summary.retried[redacted_url] = attempt + 1
+                await asyncio.sleep(self._backoff_delay(attempt, retry_after))
+
+        self.summary.failed[redacted_url] = reason
+        raise HttpRequestError(f'{reason}: {redacted_url}')
+
+    async def get_many(
+            self, urls: Iterable[Optional[str]]
+        ) -> list[JSON | None]:
+        """
+        Get json data for all urls concurrently
+        (None if failed or there is no url).
+        """
+        async def get_or_none(url: Optional[str]) -> JSON | None:
+            if url is None:
+                return None
+            try:
+                return await self.get(url)
+            except HttpRequestError:
+                return None
+
+        return await asyncio.gather(*(get_or_none(url) for url in urls))
@@ -1,48 +1,183 @@
+from typing import Iterable, Optional
 from dataclasses import dataclass
+from functools import cached_property
 import pandas as pd
+import numpy as np
+from prices.getters import EQUAL_WEIGHT
+from prices.matrix import PriceMatrix
+
+
+def _get_previous_positions(has_value: np.ndarray) -> np.ndarray:
+    """Position of the previous date with value in each column (-1 if none)."""
+    positions = np.where(
+        has_value, np.arange(len(has_value))[:, np.newaxis], -1
+    )
+    previous = np.full(has_value.shape, -1)
+    previous[1:] = np.maximum.accumulate(positions, axis=0)[:-1]
+
+    return previous
+
+
+def _compute_returns(values: np.ndarray) -> np.ndarray:
+    """
+    Dates x columns returns from the previous date with value,
+    NaN on dates without value and on the first date with it.
+    """
+    has_value = ~np.isnan(values)
+    previous = _get_previous_positions(has_value)
+    previous_values = np.take_along_axis(values, np.maximum(previous, 0), axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(
+            has_value & (previous >= 0), values / previous_values - 1, np.nan
+        )
+
+
+def get_alpha_columns(name: str, benchmarks: list[str]) -> list[str]:
+    """Alpha columns of investment, over the first benchmark and the others."""
+    return [
+        f'{name} alpha' if n == 0 else f'{name} alpha ({bench})'
+        for n, bench in enumerate(benchmarks)
+    ]
+
+
+def compute_alpha(
+        returns: pd.DataFrame, names: list[str], benchmarks: list[str]
+    ) -> pd.DataFrame:
+    """Returns of investments over returns of each of benchmarks."""
+    alpha = (
+        returns.loc[:, names].to_numpy()[:, np.newaxis, :]
+        - returns.loc[:, benchmarks].to_numpy()[:, :, np.newaxis]
+    )
+    columns = np.array(
+        [get_alpha_columns(name, benchmarks) for name in names]
+    ).T
+
+    return pd.DataFrame(
+        alpha.reshape(len(returns), -1),
+        index=returns.index,
+        columns=columns.ravel()
+    )
 
 
 @dataclass
 class Benchmark:
-    ticker: str
+    """
+    Open prices, returns and NAV of benchmarks on their trading dates
+    within start and end date, computed once for all of them from price
+    matrix. EQUAL_WEIGHT is equal weight index of universe stocks, those
+    of the period of each date, its open prices being index levels
+    starting at 1.
+    """
+    tickers: list[str]
     start_date: str
     end_date: str
     init_capital: float
-    prices: dict[str, dict[str, float | None]]
+    prices: PriceMatrix
+    # Universe stocks by period end date (as period tickers), for EQUAL_WEIGHT
+    universe: Optional[dict[str, Iterable[str]]] = None
+
+    @cached_property
+    def _rows(self) -> slice:
+        """Price matrix' rows of dates within start and end date."""
+        labels = self.prices.date_labels
+        return slice(
+            int(np.searchsorted(labels, self.start_date, side='left')),
+            int(np.searchsorted(labels, self.end_date, side='right'))
+        )
 
-    @property
-    def open_prices(self) -> pd.Series:
-        """Extracts open prices and converts into series."""
-        data = (
-            pd.DataFrame(self.prices.get(self.ticker.upper())).transpose()
-            .loc[:, 'Open']
-            .sort_index()
-            .loc[self.start_date:self.end_date]
+    def _get_universe_mask(self) -> tuple[list[int], np.ndarray]:
+        """
+        Price matrix' columns of universe stocks and dates x columns mask
+        of stocks in the universe on each date: those of the first period
+        ending on or after it (the last period's after all periods).
+        """
+        if self.universe is None:
+            raise ValueError(f'{EQUAL_WEIGHT} needs universe stocks.')
+        benchmarks = {ticker.upper() for ticker in self.tickers}
+        period_ends = sorted(self.universe)
+        symbols = sorted(
+            {
+                symbol for tickers in self.universe.values()
+                for symbol in tickers
+            }.intersection(self.prices.columns).difference(benchmarks)
+        )
+        positions = {symbol: n for n, symbol in enumerate(symbols)}
+        periods_mask = np.zeros((len(period_ends), len(symbols)), dtype=bool)
+        for n, period_end in enumerate(period_ends):
+            periods_mask[n, [
+                positions[symbol] for symbol in self.universe[period_end]
+                if symbol in positions
+            ]] = True
+        periods = np.searchsorted(
+            period_ends, self.prices.date_labels[self._rows], side='left'
         )
-        data.name = f'{self.ticker}_open'
 
-        return data
+        return (
+            [self.prices.columns[symbol] for symbol in symbols],
+            periods_mask[np.minimum(periods, len(period_ends) - 1)]
+        )
 
-    @property
-    def returns(self) -> pd.Series:
-        """Compte returns from prices"""
-        data = self.open_prices.pct_change()
-        data.name = f'{self.ticker}_returns'
-        
-        return data
-    
-    @property
-    def nav(self) -> pd.Series:
-        """Compute Net Asset Value."""
-        data = (1 + self.returns).cumprod() * self.init_capital
-        data.iloc[0] = self.init_capital
-        data.name = f'{self.ticker}_nav'
+    def _get_equal_weight_levels(self) -> np.ndarray:
+        """
+        Equal weight index levels of open to open returns of stocks
+        in the universe on the return's previous date.
+        """
+        columns, is_member = self._get_universe_mask()
+        opens = self.prices.open[self._rows][:, columns]
+        returns = _compute_returns(opens)
 
-        return data
+        has_returns = ~np.isnan(returns)
+        has_returns[1:] &= is_member[:-1]
+        counts = has_returns.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            means = np.where(has_returns, returns, 0).sum(axis=1) / counts
+        levels = np.cumprod(np.where(counts > 0, 1 + means, 1))
 
-    def compute_period_returns(self, selected_dates: list[str]) -> pd.Series:
-        """Compute returns between selected dates."""
-        data = self.open_prices.loc[selected_dates].pct_change()
-        data.name = self.ticker.upper()
+        return np.where(~np.isnan(opens).all(axis=1), levels, np.nan)
 
-        return data
\ No newline at end of file
+    @cached_property
+    def _open(self) -> tuple[np.ndarray, np.ndarray]:
+        """Dates with any benchmark's price and dates x benchmarks prices."""
+        opens = np.column_stack([
+            self._get_equal_weight_levels() if ticker == EQUAL_WEIGHT
+            else self.prices.open[self._rows, self.prices.columns[ticker]]
+            for ticker in (ticker.upper() for ticker in self.tickers)
+        ])
+        rows = ~np.isnan(opens).all(axis=1)
+
+        return self.prices.date_labels[self._rows][rows], opens[rows]
+
+    @cached_property
+    def open_prices(self) -> pd.DataFrame:
+        """Extracts open prices of benchmarks."""
+        dates, opens = self._open
+        return pd.DataFrame(
+            opens,
+            index=dates,
+            columns=[f'{ticker.upper()}_open' for ticker in self.tickers]
+        )
+
+    @cached_property
+    def returns(self) -> pd.DataFrame:
+        """Compte returns from prices"""
+        dates, opens = self._open
+        return pd.DataFrame(
+            _compute_returns(opens),
+            index=dates,
+            columns=[f'{ticker.upper()}_returns' for ticker in self.tickers]
+        )
+
+    @cached_property
+    def nav(self) -> pd.DataFrame:
+        """Compute Net Asset Value."""
+        returns = self.returns.to_numpy()
+        has_price = ~np.isnan(self._open[1])
+        nav = np.cumprod(np.where(np.isnan(returns), 1, 1 + returns), axis=0)
+        nav = nav * self.init_capital
+        # Starts with initial capital on the first date with price
+        nav[_get_previous_positions(has_price) < 0] = self.init_capital
+        return pd.DataFrame(
+            np.where(has_price, nav, np.nan),
+            index=self.returns.index,
+            columns=[f'{ticker.upper()}_nav' for ticker in self.tickers]
+        )
@@ -1,69 +1,39 @@
-from typing import Optional, Iterable
+from typing import Optional
 import pandas as pd
+from prices.matrix import PriceMatrix
+from prices.calendar import TradingCalendar
+from backtests.dates import holdings
 
 
-def get_stocks_dates_in_ptf(
-        rank_input_data: dict[str, pd.DataFrame],
-        stocks_prices: dict[str, dict[str, float | None]],
+def get_next_period(rank_date: str) -> tuple[pd.Timestamp, pd.Timestamp]:
+    """
+    First and last day of the month following the rank date
+    (not incl. last trading dates of previous month).
+    """
+    month_end = pd.offsets.MonthEnd().rollforward(pd.to_datetime(rank_date))
+    return month_end + pd.Timedelta(days=1), month_end + pd.offsets.MonthEnd()
+
+
+def get_holdings_in_ptf(
+        ranked_data: dict[str, pd.DataFrame],
+        price_matrix: PriceMatrix,
+        calendar: TradingCalendar,
         number_of_top_stocks: int,
         is_ranking_rs_limited: bool = False,
         is_ranking_sma_filtered: bool = False,
         rs_limit: Optional[int] = 0
-    ) -> dict[str, Iterable[str]]:
+    ) -> holdings.Holdings:
     """
-    Get ranked symbols and their all days in portfolio
-    within current month (not incl. last trading dates of previous month.)
-    Used for strategy computation.
+    Get ranked symbols held on their all days in portfolio
+    within current month. Used for strategy computation.
     """
-    dates_in_portfolio: dict[str, Iterable[str]] = {}
-
-    for rank_date, stocks_ranking in rank_input_data.items():
-
-        #stocks_ranking = stocks_ranking.loc[stocks_ranking['esr_rank'].notna()]
-
-        # Filters out stocks with RS rank not in first 200.
-        if is_ranking_rs_limited:
-            stocks_ranking = stocks_ranking.sort_values(
-                by='rank', ascending=False
-            ).iloc[:rs_limit - 1, :]
-
-        # Filters out from TOP stocks with SMA_STOCK < last
-        if is_ranking_sma_filtered:
-            stocks_ranking = stocks_ranking.query('is_sma_below == 0')
-
-        # Sorted list by esr_rank (descending)
-        top_stocks = sorted(
-            stocks_ranking.loc[:, 'rank'].sort_values(ascending=False)
-            .iloc[:number_of_top_stocks].index
-        )
-        
-        rank_date = pd.to_datetime(rank_date)
-
-        next_month_interval_range = pd.interval_range(
-            start=rank_date, periods=1, freq='ME')
-        
-        next_month_dates_range = pd.date_range(
-            start=next_month_interval_range[0].left,
-            end=next_month_interval_range[0].right,
-            freq='D',
-        )
-        next_month_dates = (
-            [str(i.date()) for i in next_month_dates_range[1:]]
-        )
-        
-        for stock in top_stocks:
-
-            stock_trading_dates = stocks_prices[stock].keys()
-            
-            next_month_trading_dates = sorted(
-                set(stock_trading_dates).intersection(set(next_month_dates))
-            )
-
-            if stock not in dates_in_portfolio:
-                dates_in_portfolio[stock] = next_month_trading_dates
-            else:
-                trading_dates = dates_in_portfolio[stock]
-                trading_dates.extend(next_month_trading_dates)
-                dates_in_portfolio[stock] = sorted(set(trading_dates))
-            
-    return dates_in_portfolio
\ No newline at end of file
+    return holdings.build_holdings(
+        ranked_data,
+        price_matrix,
+        calendar,
+        get_next_period,
+        number_of_top_stocks,
+        is_ranking_rs_limited=is_ranking_rs_limited,
+        is_ranking_sma_filtered=is_ranking_sma_filtered,
+        rs_limit=rs_limit
+    )
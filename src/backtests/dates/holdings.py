@@ -0,0 +1,142 @@
+from typing import Callable, Optional
+from dataclasses import dataclass
+import pandas as pd
+import numpy as np
+from prices.matrix import PriceMatrix
+from prices.calendar import TradingCalendar
+
+
+@dataclass
+class Holdings:
+    """
+    Dates x symbols boolean mask of stocks in portfolio, dates being
+    portfolio dates (any stock held) and symbols sorted.
+    """
+    dates: list[str]
+    symbols: tuple[str, ...]
+    mask: np.ndarray
+
+
+def _get_top(
+        ranks: np.ndarray, is_candidate: np.ndarray, number: int
+    ) -> Optional[np.ndarray]:
+    """
+    Mask of first number candidates (as iloc[:number]) by rank descending,
+    NaN last, with partial selection instead of sorting. None if ranks
+    tie across the cut, then selection depends on the sort's tie order.
+    """
+    candidates = np.flatnonzero(is_candidate)
+    number = len(range(len(candidates))[:number])
+    top = np.zeros(len(ranks), dtype=bool)
+    if number == len(candidates):
+        top[candidates] = True
+        return top
+    if number == 0:
+        return top
+
+    keys = np.where(np.isnan(ranks[candidates]), np.inf, -ranks[candidates])
+    kth = np.partition(keys, number - 1)[number - 1]
+    if np.count_nonzero(keys <= kth) > number:
+        return None
+    top[candidates[keys <= kth]] = True
+
+    return top
+
+
+def _select_top_stocks_sorted(
+        stocks_ranking: pd.DataFrame,
+        number_of_top_stocks: int,
+        is_ranking_rs_limited: bool = False,
+        is_ranking_sma_filtered: bool = False,
+        rs_limit: Optional[int] = 0
+    ) -> list[str]:
+    """Top ranked stocks (sorted) selected by sorting rankings."""
+    # Filters out stocks with RS rank not in first 200.
+    if is_ranking_rs_limited:
+        stocks_ranking = stocks_ranking.sort_values(
+            by='rank', ascending=False
+        ).iloc[:rs_limit - 1, :]
+
+    # Filters out from TOP stocks with SMA_STOCK < last
+    if is_ranking_sma_filtered:
+        stocks_ranking = stocks_ranking.query('is_sma_below == 0')
+
+    return sorted(
+        stocks_ranking.loc[:, 'rank'].sort_values(ascending=False)
+        .iloc[:number_of_top_stocks].index
+    )
+
+
+def select_top_stocks(
+        stocks_ranking: pd.DataFrame,
+        number_of_top_stocks: int,
+        is_ranking_rs_limited: bool = False,
+        is_ranking_sma_filtered: bool = False,
+        rs_limit: Optional[int] = 0
+    ) -> list[str]:
+    """
+    Top ranked stocks (sorted) after RS limit and SMA filter.
+    Ranks tied across a cut are selected by sorting as before.
+    """
+    ranks = stocks_ranking['rank'].to_numpy(dtype=np.float64)
+    is_candidate = np.ones(len(ranks), dtype=bool)
+
+    if is_ranking_rs_limited:
+        is_candidate = _get_top(ranks, is_candidate, rs_limit - 1)
+    if is_candidate is not None and is_ranking_sma_filtered:
+        is_candidate &= stocks_ranking['is_sma_below'].to_numpy() == 0
+    top = (
+        _get_top(ranks, is_candidate, number_of_top_stocks)
+        if is_candidate is not None else None
+    )
+    if top is None:
+        return _select_top_stocks_sorted(
+            stocks_ranking,
+            number_of_top_stocks,
+            is_ranking_rs_limited=is_ranking_rs_limited,
+            is_ranking_sma_filtered=is_ranking_sma_filtered,
+            rs_limit=rs_limit
+        )
+
+    return sorted(stocks_ranking.index[top])
+
+
+def build_holdings(
+        ranked_data: dict[str, pd.DataFrame],
+        price_matrix: PriceMatrix,
+        calendar: TradingCalendar,
+        get_next_period: Callable[[str], tuple[pd.Timestamp, pd.Timestamp]],
+        number_of_top_stocks: int,
+        is_ranking_rs_limited: bool = False,
+        is_ranking_sma_filtered: bool = False,
+        rs_limit: Optional[int] = 0
+    ) -> Holdings:
+    """
+    Holdings of top ranked stocks on their trading days within the period
+    following each rank date. Mask is built over price matrix' calendar
+    (dates and symbols) and cut to portfolio dates and symbols.
+    """
+    mask = np.zeros(price_matrix.has_bar.shape, dtype=bool)
+    for rank_date, stocks_ranking in ranked_data.items():
+        top_stocks = select_top_stocks(
+            stocks_ranking,
+            number_of_top_stocks,
+            is_ranking_rs_limited=is_ranking_rs_limited,
+            is_ranking_sma_filtered=is_ranking_sma_filtered,
+            rs_limit=rs_limit
+        )
+        first, last = calendar.get_bounds(*get_next_period(rank_date))
+        columns = [price_matrix.columns[stock] for stock in top_stocks]
+        mask[first:last, columns] |= price_matrix.has_bar[first:last, columns]
+
+    rows = np.flatnonzero(mask.any(axis=1))
+    columns = sorted(
+        np.flatnonzero(mask.any(axis=0)),
+        key=lambda n: price_matrix.symbols[n]
+    )
+
+    return Holdings(
+        dates=price_matrix.date_labels[rows].tolist(),
+        symbols=tuple(price_matrix.symbols[n] for n in columns),
+        mask=mask[np.ix_(rows, columns)],
+    )
@@ -1,21 +1,18 @@
 import os
 import logging
-from typing import Iterable
-import importlib
+from typing import Iterable, Optional
 import tomllib
-import json
 import pandas as pd
 from libs.helpers import writers
 from libs.helpers.interfaces import ReplaceIntervals
-from symbols import getters as symb_proc
-from prices import prices
-from ranks.esr import rank
-from ranks.esr import processors as rank_proc
-from backtests.dates import backtest_dates, period_first_dates
-from backtests import benchmark, investment
+from backtests import benchmark, investment, sweep
 
 
-def main(scenarios: Iterable[Iterable[float]], first_rank_date: str) -> None: 
+def main(
+        scenarios: Iterable[Iterable[float] | sweep.Scenario],
+        first_rank_date: str,
+        sweep_data: Optional[sweep.SweepData] = None
+    ) -> None:
 
     with open('config.toml', 'rb') as file:
         config = tomllib.load(file)
@@ -25,9 +22,11 @@ def main(scenarios: Iterable[Iterable[float]], first_rank_date: str) -> None:
     
     INITIAL_CAPITAL = config['portfolio']['initial_capital']
     BENCHMARK_TICKER = config['portfolio']['benchmark']
+    EXTRA_BENCHMARKS = config['portfolio']['extra_benchmarks']
 
     PERIODS_PER_YEAR = config['performance']['periods_per_year']
-    IS_REBALANCED = config['performance']['is_rebalanced']
+
+    MAX_WORKERS = config['backtest']['max_workers']
 
     RANK_STRATEGY = config['rank']['strategy']
     IS_RANK_BONGO_FILTERED = config['rank']['is_rank_sma_filtered']
@@ -35,9 +34,6 @@ def main(scenarios: Iterable[Iterable[float]], first_rank_date: str) -> None:
     IS_RANK_RS_LIMITED = config['rank']['is_rank_rs_limited']
     RS_LIMIT = config['rank']['rs_limit']
     
-    PERIOD_TICKERS_FILE = config['repo_files']['period_tickers']
-    DB_FILE = config['repo_files']['db']
-
     SCORING = config['scoring']
 
     REPLACE_STRATEGY = config['replacement']['replace_strategy']
@@ -49,11 +45,6 @@ def main(scenarios: Iterable[Iterable[float]], first_rank_date: str) -> None:
     elif REPLACEMENT_FREQUENCY == ReplaceIntervals.WEEKLY:
         RANK_INTERVAL = 'weekly'
 
-    RANK_INPUT_FILE = os.path.join(
-        config['repo_files']['path'],
-        f'rank_input_data_{RANK_STRATEGY}_{RANK_INTERVAL}.json'
-    )
-
     RANK_OUTPUT_FILE = os.path.join(
         config['output_files']['path'],
         f'ranked_{RANK_STRATEGY}_{RANK_INTERVAL}'
@@ -67,192 +58,82 @@ def main(scenarios: Iterable[Iterable[float]], first_rank_date: str) -> None:
         f'perform_{RANK_STRATEGY}_{RANK_INTERVAL}_top{TOP}_{REPLACE_STRATEGY}'
     )
 
-    with open(PERIOD_TICKERS_FILE) as file:
-        period_tickers: Iterable[str] = (json.load(file))
-
-    all_tickers = symb_proc.get_all_ptf_tickers(period_tickers)
-
-    stocks_prices = prices.get_stocks_prices_form_db(
-        all_tickers,
-        DB_FILE
-    )
-
-    with open(RANK_INPUT_FILE) as file:
-        rank_input_data: dict[str, dict[str, dict[str, float]]] = json.load(file)
+    # Prices and rank input data already loaded by --sweep are reused
+    if sweep_data is None:
+        sweep_data = sweep.load_sweep_data(config, first_rank_date)
+    price_matrix = sweep_data.price_matrix
+
+    sweep_scenarios = [
+        scenario if isinstance(scenario, sweep.Scenario)
+        else sweep.get_scenario(
+            weights=scenario,
+            score_weights=SCORING,
+            investment_name=PTF_NAME,
+            top=TOP,
+            transaction_fee=TRANSACTION_FEE
+        ) for scenario in scenarios
+    ]
+    ptfs_tops = {scenario.name: scenario.top for scenario in sweep_scenarios}
+    results = sweep.run_scenarios(sweep_scenarios, sweep_data, MAX_WORKERS)
+    logging.info(f'{len(results)} scenarios backtested.')
 
     ranked_data_output: dict[str, dict[str, pd.DataFrame| None]] = {}
 
     ptfs_backtests: dict[str, pd.DataFrame] = {}
     ptfs_tickers_share_in_ptf_stats: dict[str, pd.DataFrame] = {}
     ptfs_tickers_infos: dict[str, pd.DataFrame] = {}
+    ptfs_transactions: dict[str, pd.DataFrame] = {}
 
-    ptfs_perf_metrics: dict[str, dict[str, float | None]] = {}
-    m_ptfs_perf_returns: dict[str, dict[str, float | None]] = {}
-    y_ptfs_perf_returns: dict[str, dict[str, float | None]] = {}
     ptfs_drawdowns_stats: dict[str, dict[str, float | None]] = {}
 
-    for scenario in scenarios:
-        score_weights = SCORING
-        score_weights['eps_rank'] = scenario[0]
-        score_weights['sales_rank'] = scenario[1]
-        score_weights['price_rank'] = scenario[2]
-
-        ptf_name = (
-            f"{PTF_NAME.upper()}_{scenario[0]*100:.0f}-"
-            f"{scenario[1]*100:.0f}-{scenario[2]*100:.0f}"
-        )
-
-        full_ranked_data = rank.compute_ranked_data(
-            rank_input_data=rank_input_data,
-            score_weights=score_weights,
-        )
-        ranked_data = rank_proc.limit_ranked_data_from_start_date(
-            ranked_data=full_ranked_data,
-            first_ranking_date=first_rank_date
-        )
-        ranked_data: dict[str, pd.DataFrame] = (
-            {date: pd.DataFrame(score) for date, score in ranked_data.items()}
-            )
-        ranked_data = {
-            date: ranked_data[date] for date in sorted(ranked_data)
-        }
-        ranked_data_output[ptf_name] = ranked_data
-
-        dates_in_ptf_module = importlib.import_module(
-            name=f'.dates_{RANK_INTERVAL}',
-            package='backtests.dates.dates_in_ptf_plugins'
+    for result in results:
+        ranked_data_output[result.name] = result.ranked_data
+        ptfs_backtests[result.name] = result.backtest
+        ptfs_drawdowns_stats[result.name] = result.drawdowns_stats
+        ptfs_tickers_share_in_ptf_stats[result.name] = (
+            result.tickers_share_in_ptf_stats
         )
+        ptfs_tickers_infos[result.name] = result.tickers_infos
+        ptfs_transactions[result.name] = result.transactions
 
-        stocks_dates_in_ptf = dates_in_ptf_module.get_stocks_dates_in_ptf(
-            ranked_data,
-            stocks_prices,
-            number_of_top_stocks=TOP,
-            is_ranking_sma_filtered=IS_RANK_SMA_FILTERED,
-            is_ranking_rs_limited=IS_RANK_RS_LIMITED,
-            rs_limit=RS_LIMIT
-        )
-
-        ptf_all_dates = backtest_dates.get_backtest_dates(stocks_dates_in_ptf)
-
-        m_first_trading_dates = (
-            period_first_dates.get_first_trading_dates_of_month(
-                ranked_data=ranked_data,
-                backtest_dates=ptf_all_dates
-            )
-        )
-        y_first_trading_dates = (
-            period_first_dates.get_first_trading_dates_of_year(
-                ranked_data=ranked_data,
-                backtest_dates=ptf_all_dates
-            )
-        )
-
-        strategy_module = importlib.import_module(
-            name=f'.strategy_{REPLACE_STRATEGY}',
-            package=f'backtests.strategies.{RANK_STRATEGY}.strategy_plugins'
-        )
-
-        backtest_data = strategy_module.compute_ptf_performance(
-            stocks_dates_in_ptf,
-            ptf_all_dates,
-            stocks_prices,
-            m_first_trading_dates,
-            is_rebalanced=IS_REBALANCED,
-            transaction_fee=TRANSACTION_FEE,
-            init_capital=INITIAL_CAPITAL,
-        )
-
-        invest = investment.Investment(
-            name=PTF_NAME,
-            backtest_data=backtest_data[0],
-            periods_per_year=252
-        )
-        ptfs_backtests[ptf_name] = pd.concat([
-            backtest_data[0], invest.returns, invest.drawdowns
-        ], axis=1)
-        ptfs_drawdowns_stats[ptf_name] = invest.drawdowns_stats
-        ptfs_perf_metrics[ptf_name] = invest.metrics.to_dict()
-
-        tickers_share_in_ptf_stats = investment.get_tickers_share_in_pft_stats(
-            tickers_share_in_ptf=backtest_data[4]
-        )
-        ptfs_tickers_share_in_ptf_stats[ptf_name] = tickers_share_in_ptf_stats
-
-        tickers_infos = investment.get_tickers_perf_detailed_info(
-            tickers_prices=backtest_data[1],
-            tickers_returns=backtest_data[2],
-            tickers_nav=backtest_data[3],
-            tickers_share_in_ptf=backtest_data[4]
-        )
-        ptfs_tickers_infos[ptf_name] = tickers_infos
-
-        # PTF RETURNS MONTHLY
-        m_ptfs_returns = invest.compute_period_returns(
-            selected_dates=m_first_trading_dates
-        )
-        m_ptfs_perf_returns[ptf_name] = m_ptfs_returns.to_dict()
-
-        # PTF RETURNS YEARLY
-        y_ptfs_returns = invest.compute_period_returns(
-            selected_dates=y_first_trading_dates
-        )
-        y_ptfs_perf_returns[ptf_name] = y_ptfs_returns.to_dict()
-    
-    # BENCHMARK
-    bench_prices = prices.get_stocks_prices_form_db(
-        symbols=[BENCHMARK_TICKER],
-        db_file_path=DB_FILE
-    )
+    ptf_all_dates = results[-1].ptf_all_dates
+    m_first_trading_dates = results[-1].m_first_trading_dates
+    y_first_trading_dates = results[-1].y_first_trading_dates
 
+    # BENCHMARKS (the first one for drawdowns)
     bench = benchmark.Benchmark(
-        ticker=BENCHMARK_TICKER,
+        tickers=[BENCHMARK_TICKER, *EXTRA_BENCHMARKS],
         start_date=ptf_all_dates[0],
         end_date=ptf_all_dates[-1],
         init_capital=INITIAL_CAPITAL,
-        prices=bench_prices
+        prices=price_matrix,
+        universe=sweep_data.period_tickers
     )
+    benchs_names = [ticker.upper() for ticker in bench.tickers]
+    benchs_navs = {
+        name: bench.nav.loc[:, [f'{name}_nav']].dropna()
+        for name in benchs_names
+    }
 
+    bench_name = benchs_names[0]
     bench_invest = investment.Investment(
-        BENCHMARK_TICKER.upper(), bench.nav.to_frame(), PERIODS_PER_YEAR
+        bench_name, benchs_navs[bench_name], PERIODS_PER_YEAR
     )
 
-    # METRICS
-    ptfs_perf_metrics_df = pd.DataFrame(ptfs_perf_metrics)
-    bench_metrics = bench_invest.metrics
-    metrics = bench_metrics.to_frame().merge(
-        ptfs_perf_metrics_df, how='left', left_index=True, right_index=True
+    # METRICS (benchmarks and all portfolios at once)
+    metrics_batch = investment.MetricsBatch.from_backtests(
+        {**benchs_navs, **ptfs_backtests}, PERIODS_PER_YEAR
     )
+    metrics = metrics_batch.metrics
 
     # PERIOD RETURNS
-    m_ptfs_perf_returns_df = pd.DataFrame(m_ptfs_perf_returns)
-    m_bench_returns = bench.compute_period_returns(m_first_trading_dates)
-    m_returns = m_bench_returns.to_frame().merge(
-        m_ptfs_perf_returns_df, how='left', left_index=True, right_index=True
-    )
-    y_ptfs_perf_returns_df = pd.DataFrame(y_ptfs_perf_returns)
-    y_bench_returns = bench.compute_period_returns(y_first_trading_dates)
-    y_returns = y_bench_returns.to_frame().merge(
-        y_ptfs_perf_returns_df, how='left', left_index=True, right_index=True
-    )
+    m_returns = metrics_batch.compute_period_returns(m_first_trading_dates)
+    y_returns = metrics_batch.compute_period_returns(y_first_trading_dates)
 
     # ALPHA
-    m_alpha = {}
-    for ptf_name in m_ptfs_perf_returns_df.columns:
-        m_scenario_returns = m_ptfs_perf_returns_df.loc[:, ptf_name]
-        m_alpha[f'{ptf_name} alpha'] = m_scenario_returns - m_bench_returns
-    m_alpha_df = pd.DataFrame(
-        data=m_alpha.values(),
-        index=m_alpha.keys()
-    ).transpose()
-
-    y_alpha = {}
-    for ptf_name in y_ptfs_perf_returns_df.columns:
-        y_scenario_returns = y_ptfs_perf_returns_df.loc[:, ptf_name]
-        y_alpha[f'{ptf_name} alpha'] = y_scenario_returns - y_bench_returns
-    y_alpha_df = pd.DataFrame(
-        data=y_alpha.values(),
-        index=y_alpha.keys()
-    ).transpose()
+    ptfs_names = list(ptfs_backtests)
+    m_alpha_df = benchmark.compute_alpha(m_returns, ptfs_names, benchs_names)
+    y_alpha_df = benchmark.compute_alpha(y_returns, ptfs_names, benchs_names)
 
     # PRINT RESULTS
     print(round(metrics, 2))
@@ -270,7 +151,7 @@ def main(scenarios: Iterable[Iterable[float]], first_rank_date: str) -> None:
 
     if save_backtest:
         with pd.ExcelWriter(
-            f'{BACKTEST_OUTPUT_FILE}_demo_{int(scenarios[0][-1]*100)}_from_{first_rank_date}.xlsx'
+            f'{BACKTEST_OUTPUT_FILE}_demo_{int(sweep_scenarios[0].score_weights["price_rank"]*100)}_from_{first_rank_date}.xlsx'
             ) as writer:
             metrics.to_excel(
                 writer, sheet_name='metrics',
@@ -325,7 +206,7 @@ def main(scenarios: Iterable[Iterable[float]], first_rank_date: str) -> None:
                             new_ranking = new_ranking.query('sma == 0')
                         new_ranking = new_ranking.sort_values(
                             by='rank', ascending=False
-                        ).iloc[:TOP, :]
+                        ).iloc[:ptfs_tops[ptf_name], :]
                         new_ranking.to_excel(
                             writer, sheet_name=date, freeze_panes=(1, 0)
                         )
@@ -343,29 +224,26 @@ def main(scenarios: Iterable[Iterable[float]], first_rank_date: str) -> None:
 
     if save_perf:
         for ptf_name in ptfs_backtests.keys():
-            scenario_metrics = pd.concat(
-                [ptfs_perf_metrics_df.loc[:, ptf_name], bench_metrics],
-                axis=1
-            )
+            scenario_metrics = metrics.loc[:, [ptf_name, *benchs_names]]
+            alpha_columns = benchmark.get_alpha_columns(ptf_name, benchs_names)
             scenario_full_data = pd.concat([
                 ptfs_backtests.get(ptf_name),
                 bench.open_prices,
                 bench.returns,
                 bench.nav,
                 bench_invest.drawdowns,
-                ptfs_tickers_share_in_ptf_stats.get(ptf_name),
-                ptfs_tickers_infos.get(ptf_name)
+                ptfs_tickers_share_in_ptf_stats.get(ptf_name)
             ], axis=1)
+            scenario_tickers_infos = ptfs_tickers_infos.get(ptf_name)
+            scenario_transactions = ptfs_transactions.get(ptf_name)
             scenario_y_returns = pd.concat([
-                y_returns.loc[:, ptf_name],
-                y_bench_returns,
-                y_alpha_df.loc[:, f'{ptf_name} alpha']
+                y_returns.loc[:, [ptf_name, *benchs_names]],
+                y_alpha_df.loc[:, alpha_columns]
                 ], axis=1
             )
             scenario_m_returns = pd.concat([
-                m_returns.loc[:, ptf_name],
-                m_bench_returns,
-                m_alpha_df.loc[:, f'{ptf_name} alpha']
+                m_returns.loc[:, [ptf_name, *benchs_names]],
+                m_alpha_df.loc[:, alpha_columns]
                 ], axis=1
             )
             scenario_drawdowns_stats = pd.concat((
@@ -382,6 +260,14 @@ def main(scenarios: Iterable[Iterable[float]], first_rank_date: str) -> None:
                     writer, sheet_name='d_full_data',
                     freeze_panes=(1, 0)
                 )
+                scenario_tickers_infos.to_excel(
+                    writer, sheet_name='d_tickers', index=False,
+                    freeze_panes=(1, 0)
+                )
+                scenario_transactions.to_excel(
+                    writer, sheet_name='transactions', index=False,
+                    freeze_panes=(1, 0)
+                )
                 scenario_y_returns.to_excel(
                     writer, sheet_name='y_returns', index=True,
                     freeze_panes=(1, 0)
@@ -396,6 +282,8 @@ def main(scenarios: Iterable[Iterable[float]], first_rank_date: str) -> None:
                 )
                 writers.adjust_columns_width(scenario_metrics, 'metrics', writer)
                 writers.adjust_columns_width(scenario_full_data, 'd_full_data', writer) 
+                writers.adjust_columns_width(scenario_tickers_infos, 'd_tickers', writer)
+                writers.adjust_columns_width(scenario_transactions, 'transactions', writer)
                 writers.adjust_columns_width(scenario_y_returns, 'y_returns', writer) 
                 writers.adjust_columns_width(scenario_m_returns, 'm_returns', writer) 
                 writers.adjust_columns_width(scenario_drawdowns_stats, 'drawdowns_stats', writer) 
@@ -1,10 +1,26 @@
-from typing import Iterable
-from dataclasses import dataclass
+from typing import Iterable, Self
+from dataclasses import dataclass, field
 from functools import cached_property
-import datetime
 import pandas as pd
 import numpy as np
 
+# Metrics summing backtest data columns of transactions.
+TRANSACTIONS_METRICS = {
+    '# of replacement transactions': 'replace_trans_counts',
+    'replacement transactions cost': 'replace_trans_costs',
+    '# of rebalance transactions': 'rebal_trans_counts',
+    'rebalance transactions cost': 'rebal_trans_costs',
+    '# of strategy transactions': 'strategy_trans_counts',
+    'strategy transactions cost': 'strategy_trans_costs',
+}
+
+
+def _get_nav(name: str, backtest_data: pd.DataFrame) -> pd.Series:
+    try:
+        return backtest_data.loc[:, 'nav']
+    except KeyError:
+        return backtest_data.loc[:, f'{name}_nav']
+
 
 @dataclass
 class Investment:
@@ -14,10 +30,7 @@ class Investment:
 
     @cached_property
     def nav(self) -> pd.Series:
-        try:
-            return self.backtest_data.loc[:, 'nav']
-        except KeyError:
-            return self.backtest_data.loc[:, f'{self.name}_nav']
+        return _get_nav(self.name, self.backtest_data)
 
     @cached_property
     def returns(self) -> pd.Series:
@@ -51,7 +64,7 @@ class Investment:
         data.name = f'{self.name}_previous_peaks'
         return data
     
-    @property
+    @cached_property
     def drawdowns(self) -> pd.Series:
         data = (self.nav - self.previous_peaks) / self.previous_peaks
         data.name = f'{self.name}_drawdowns'
@@ -61,44 +74,41 @@ class Investment:
     def days_invested(self):
         return len(self.nav)
 
-    @property
+    @cached_property
     def drawdowns_stats(self) -> pd.DataFrame:
-        peaks = self.previous_peaks.groupby(
-            by=self.previous_peaks.values, sort=True).groups
-        
-        for previous_peak, dates in peaks.items():
-            peaks.update(
-                {previous_peak: {date: self.drawdowns[date] for date in dates}})
-
-        stats = {}
-        for previous_peak, data in peaks.items():
-            length: int = len(data)
-            sorted_dates: list[datetime.date] = sorted(data.keys())
-            started: datetime.date = sorted_dates[0]
-            max_ddwn: float = min(data.values())
-            max_ddwn_date: datetime.date = (
-                [k for k, v in data.items() if v == max_ddwn][0]
-            )
-            stats[started] = {
-                f'# of periods': length,
-                f'max drawdown': max_ddwn,
-                f'max drawdown timing': max_ddwn_date,
-                f'periods to max dd': sorted_dates.index(max_ddwn_date)
-                }
-            
-        res = pd.DataFrame(stats).transpose().sort_values(by=f'max drawdown')
-        res = res.loc[res['max drawdown'] < 0]
-        res.index.name = 'started'
-        res.reset_index(inplace=True)
-        res.rename(columns={
-            'started': f'started ({self.name})',
-            '# of periods': f'# of periods ({self.name})',
-            'max drawdown': f'max drawdown ({self.name})',
-            'max drawdown timing': f'max drawdown timing ({self.name})',
-            'periods to max dd': f'periods to max dd ({self.name})',
-            }, inplace=True)
-
-        return res
+        """
+        Drawdown episodes, from a new peak until the next one, deepest first:
+        start, length, max drawdown with its date and periods to it, and
+        recovery (date of the next peak, None if not recovered yet).
+        """
+        peaks = self.previous_peaks.to_numpy(dtype=np.float64)
+        rows = np.flatnonzero(~np.isnan(peaks))
+        peaks = peaks[rows]
+        drawdowns = self.drawdowns.to_numpy(dtype=np.float64)[rows]
+        dates = self.nav.index[rows]
+
+        # Episode starts where previous peak changes
+        is_start = np.ones(len(rows), dtype=bool)
+        is_start[1:] = peaks[1:] != peaks[:-1]
+        starts = np.flatnonzero(is_start)
+        ends = np.append(starts[1:], len(rows))
+        # Sorted by episode, then drawdown (first of equal ones first)
+        troughs = np.lexsort((drawdowns, np.cumsum(is_start)))[starts]
+
+        stats = pd.DataFrame({
+            'started': dates[starts],
+            '# of periods': ends - starts,
+            'max drawdown': drawdowns[troughs],
+            'max drawdown timing': dates[troughs],
+            'periods to max dd': troughs - starts,
+            'recovery': [*dates[starts[1:]], None][:len(starts)],
+        })
+        stats = stats.loc[stats['max drawdown'] < 0].sort_values(
+            by='max drawdown', kind='stable', ignore_index=True
+        )
+        stats.columns = [f'{column} ({self.name})' for column in stats.columns]
+
+        return stats
 
     @property
     def replace_transactions_number(self):
@@ -204,48 +214,188 @@ class Investment:
         return data
 
 
-def get_tickers_perf_detailed_info(
-    tickers_prices: pd.DataFrame,
-    tickers_returns: pd.DataFrame,
-    tickers_nav: pd.DataFrame,
-    tickers_share_in_ptf: pd.DataFrame
-    ) -> pd.DataFrame:
+def _nanstd(values: np.ndarray) -> np.ndarray:
+    """Standard deviation (ddof 1) of rows skipping NaN, as pandas does."""
+    is_nan = np.isnan(values)
+    counts = (~is_nan).sum(axis=1).astype(np.float64)
+    divisors = counts - 1
+    counts[divisors <= 0] = np.nan
+    divisors[divisors <= 0] = np.nan
+    means = np.where(is_nan, 0, values).sum(axis=1) / counts
+    squares = np.where(is_nan, 0, (means[:, np.newaxis] - values) ** 2)
+
+    return np.sqrt(squares.sum(axis=1) / divisors)
+
 
+def _compute_metrics(
+        navs: np.ndarray,
+        transactions: dict[str, np.ndarray],
+        periods_per_year: int
+    ) -> dict[str, np.ndarray]:
     """
-    Create table with combined prices,
-    returns, capital and share in ptf.
+    Metrics of investments x dates NAVs (no NaN) as Investment.metrics,
+    each row reduced the way pandas reduces a single series.
     """
-    info = []
-    for ticker in tickers_share_in_ptf.columns:
-        x = pd.concat([
-            tickers_prices.loc[:, f'{ticker}_open'],
-            tickers_returns.loc[:, f'{ticker}_ret'],
-            tickers_nav.loc[:, f'{ticker}_cap'],
-            tickers_share_in_ptf.loc[:, ticker],
-        ], axis=1).sort_index()
-        info.append(x)
+    n_periods = navs.shape[1]
+    returns = np.full(navs.shape, np.nan)
+    previous_peaks = np.maximum.accumulate(navs, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[:, 1:] = navs[:, 1:] / navs[:, :-1] - 1
+        drawdowns = (navs - previous_peaks) / previous_peaks
+        cumulative_returns = (
+            np.where(np.isnan(returns), 1, 1 + returns).prod(axis=1) - 1
+        )
+        # Scalar powers, vectorized ones may differ in the last digit
+        annualized_returns = np.array([
+            (1 + cumulative) ** (periods_per_year / n_periods) - 1
+            for cumulative in cumulative_returns
+        ])
+        annualized_volatility = _nanstd(returns) * (periods_per_year ** 0.5)
+        raw_sharp_ratio = annualized_returns / annualized_volatility
 
-    return pd.concat(info, axis=1).sort_index()
+    return {
+        'last_ptf_value': navs[:, -1],
+        'max_ptf_value': navs.max(axis=1),
+        'cumulative_returns': cumulative_returns,
+        'annualized_returns': annualized_returns,
+        'annualized_volatility': annualized_volatility,
+        'positive_months': (returns > 0).sum(axis=1),
+        'negative_months': (returns < 0).sum(axis=1),
+        'max_drawdown': drawdowns.min(axis=1),
+        'raw_sharp_ratio': raw_sharp_ratio,
+        'days_invested': np.full(len(navs), n_periods),
+        **{
+            metric: np.where(np.isnan(values), 0, values).sum(axis=1)
+            for metric, values in transactions.items()
+        },
+    }
+
+
+@dataclass
+class MetricsBatch:
+    """
+    Metrics and period returns of many investments at once from dates x
+    investments NAVs (NaN on dates an investment has no value). Numbers are
+    the ones Investment computes for each of them.
+    """
+    names: list[str]
+    dates: pd.Index
+    navs: np.ndarray
+    # Metric -> dates x investments transactions (NaN for investments without)
+    transactions: dict[str, np.ndarray] = field(default_factory=dict)
+    periods_per_year: int = 252
+
+    @classmethod
+    def from_backtests(
+            cls,
+            backtests: dict[str, pd.DataFrame],
+            periods_per_year: int = 252
+        ) -> Self:
+        """Create from investment name -> backtest data (as Investment's)."""
+        dates = None
+        for data in backtests.values():
+            if dates is None:
+                dates = data.index
+            elif not data.index.equals(dates):
+                dates = dates.union(data.index)
+        dates = dates.sort_values()
+
+        # Filled by investment (rows), returned as dates x investments
+        navs = np.full((len(backtests), len(dates)), np.nan)
+        transactions = {
+            metric: np.full((len(backtests), len(dates)), np.nan)
+            for metric in TRANSACTIONS_METRICS
+        }
+        for n, (name, data) in enumerate(backtests.items()):
+            positions = (
+                slice(None) if data.index.equals(dates)
+                else dates.get_indexer(data.index)
+            )
+            navs[n, positions] = _get_nav(name, data).to_numpy(np.float64)
+            for metric, column in TRANSACTIONS_METRICS.items():
+                if column in data.columns:
+                    transactions[metric][n, positions] = (
+                        data[column].to_numpy(np.float64)
+                    )
+
+        return cls(
+            names=list(backtests),
+            dates=dates,
+            navs=navs.T,
+            transactions={
+                metric: values.T for metric, values in transactions.items()
+            },
+            periods_per_year=periods_per_year,
+        )
+
+    @cached_property
+    def metrics(self) -> pd.DataFrame:
+        """
+        Metrics x investments. Investments with values on the same dates
+        are computed together as one investments x dates block.
+        """
+        has_value = ~np.isnan(self.navs.T)
+        groups: dict[bytes, list[int]] = {}
+        for n, pattern in enumerate(np.packbits(has_value, axis=1)):
+            groups.setdefault(pattern.tobytes(), []).append(n)
+
+        metrics: dict[str, np.ndarray] = {}
+        for members in groups.values():
+            rows = np.flatnonzero(has_value[members[0]])
+            if not len(rows):
+                continue
+            block = (
+                (members,) if len(rows) == len(self.dates)
+                else np.ix_(members, rows)
+            )
+            group_metrics = _compute_metrics(
+                self.navs.T[block],
+                {
+                    metric: values.T[block]
+                    for metric, values in self.transactions.items()
+                },
+                self.periods_per_year
+            )
+            for metric, values in group_metrics.items():
+                metrics.setdefault(
+                    metric, np.full(len(self.names), np.nan)
+                )[members] = values
+
+        for metric, values in self.transactions.items():
+            if metric in metrics:
+                has_transactions = ~np.isnan(values).all(axis=0)
+                metrics[metric][~has_transactions] = np.nan
+
+        return pd.DataFrame(metrics, index=self.names).transpose()
+
+    def compute_period_returns(self, selected_dates: list[str]) -> pd.DataFrame:
+        """Compute returns of investments between selected dates."""
+        positions = self.dates.get_indexer(selected_dates)
+        if (positions < 0).any():
+            raise KeyError(
+                f'{np.asarray(selected_dates)[positions < 0].tolist()} not in dates'
+            )
+        navs = self.navs[positions]
+        returns = np.full(navs.shape, np.nan)
+        returns[1:] = navs[1:] / navs[:-1] - 1
+
+        return pd.DataFrame(returns, index=selected_dates, columns=self.names)
 
 
 def get_tickers_share_in_pft_stats(
         tickers_share_in_ptf: pd.DataFrame
     ) -> pd.DataFrame:
     """Compute statitistics from tickrs share in ptf for each day."""
-    number_of_stocks_in_ptf = len(tickers_share_in_ptf.columns)
-    share_in_ptf = tickers_share_in_ptf.copy()
-    
-    share_in_ptf['share_max'] = share_in_ptf.apply(
-        lambda x: x.iloc[:number_of_stocks_in_ptf].max(),
-        axis=1
-    )
-    share_in_ptf['share_min'] = share_in_ptf.apply(
-        lambda x: x.iloc[:number_of_stocks_in_ptf].min(),
-        axis=1
-    )
-    share_in_ptf['share_mean'] = share_in_ptf.apply(
-        lambda x: x.iloc[:number_of_stocks_in_ptf].mean(),
-        axis=1
+    shares = np.ascontiguousarray(
+        tickers_share_in_ptf.to_numpy(dtype=np.float64)
     )
+    is_nan = np.isnan(shares)
+    counts = (~is_nan).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = np.where(is_nan, 0, shares).sum(axis=1) / counts
 
-    return share_in_ptf.iloc[:, -3:]
\ No newline at end of file
+    return pd.DataFrame({
+        'share_max': np.fmax.reduce(shares, axis=1),
+        'share_min': np.fmin.reduce(shares, axis=1),
+        'share_mean': means,
+    }, index=tickers_share_in_ptf.index)
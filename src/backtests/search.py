@@ -0,0 +1,270 @@
+from typing import Iterable, Iterator
+import heapq
+import itertools
+import logging
+import math
+import random
+import tomllib
+import pandas as pd
+from backtests import sweep
+
+# Scenarios backtested per pool run, bounds memory of grid search results.
+SCENARIOS_BATCH_SIZE = 1000
+
+Configuration = dict[str, float | int]
+# (score, configuration number, configuration)
+Entry = tuple[float, int, Configuration]
+
+
+def get_parameters_space(
+        ranges: dict[str, list[float | int]],
+        score_weights: dict[str, float],
+        top: int,
+        transaction_fee: float
+    ) -> dict[str, list[float | int]]:
+    """
+    Values to search for each scoring weight, top and transaction fee,
+    parameters without range keep their config value.
+    """
+    defaults = {**score_weights, 'top': top, 'transaction_fee': transaction_fee}
+    unknown = set(ranges) - set(defaults)
+    if unknown:
+        raise ValueError(f'unknown sweep parameters: {sorted(unknown)}')
+
+    return {
+        name: list(ranges.get(name, [default]))
+        for name, default in defaults.items()
+    }
+
+
+def get_space_size(space: dict[str, list[float | int]]) -> int:
+    """Number of configurations in the space."""
+    return math.prod(len(values) for values in space.values())
+
+
+def get_configuration(
+        space: dict[str, list[float | int]], number: int
+    ) -> Configuration:
+    """Configuration at position number of the grid."""
+    configuration = {}
+    for name, values in reversed(space.items()):
+        number, n = divmod(number, len(values))
+        configuration[name] = values[n]
+
+    return {name: configuration[name] for name in space}
+
+
+def get_grid(space: dict[str, list[float | int]]) -> Iterator[Configuration]:
+    """All configurations of the space."""
+    for values in itertools.product(*space.values()):
+        yield dict(zip(space, values))
+
+
+def get_random_sample(
+        space: dict[str, list[float | int]], samples: int, seed: int
+    ) -> list[Configuration]:
+    """Distinct configurations drawn at random from the grid."""
+    numbers = random.Random(seed).sample(
+        range(get_space_size(space)), min(samples, get_space_size(space))
+    )
+    return [get_configuration(space, number) for number in numbers]
+
+
+def get_scenario(
+        configuration: Configuration,
+        number: int,
+        investment_name: str,
+        first_rank_date: str | None = None
+    ) -> sweep.Scenario:
+    """Scenario of the configuration, named by its number."""
+    parameters = dict(configuration)
+    top = parameters.pop('top')
+    transaction_fee = parameters.pop('transaction_fee')
+    return sweep.Scenario(
+        name=f'{investment_name.upper()}_S{number}',
+        score_weights=parameters,
+        top=int(top),
+        transaction_fee=transaction_fee,
+        first_rank_date=first_rank_date,
+    )
+
+
+def get_halving_windows(
+        rank_dates: list[str], rounds: int, factor: int
+    ) -> list[str]:
+    """
+    First rank dates of successive halving rounds, each round's
+    period longer by factor, the last one being full period.
+    """
+    windows = []
+    for n in range(rounds):
+        length = math.ceil(len(rank_dates) / factor ** (rounds - 1 - n))
+        windows.append(rank_dates[-max(2, length)])
+
+    return windows
+
+
+def get_halving_rounds(candidates: int, keep_top: int, factor: int) -> int:
+    """Rounds of pruning by factor until keep_top candidates are left."""
+    rounds = 0
+    while candidates > keep_top:
+        candidates = max(keep_top, math.ceil(candidates / factor))
+        rounds += 1
+
+    return max(1, rounds)
+
+
+def evaluate(
+        configurations: Iterable[tuple[int, Configuration]],
+        data: sweep.SweepData,
+        metric: str,
+        is_metric_minimized: bool,
+        keep: int,
+        max_workers: int,
+        first_rank_date: str | None = None
+    ) -> list[Entry]:
+    """
+    Backtest configurations (metrics only) and keep the best ones,
+    batch by batch. NaN metric values rank last.
+    """
+    best: list[Entry] = []
+    configurations = iter(configurations)
+    while batch := list(itertools.islice(configurations, SCENARIOS_BATCH_SIZE)):
+        results = sweep.run_scenarios(
+            [
+                get_scenario(
+                    configuration, number, data.investment_name, first_rank_date
+                ) for number, configuration in batch
+            ],
+            data,
+            max_workers,
+            is_detailed=False
+        )
+        entries = []
+        for (number, configuration), result in zip(batch, results):
+            score = result.metrics[metric]
+            if score is None or math.isnan(score):
+                score = -math.inf
+            elif is_metric_minimized:
+                score = -score
+            entries.append((score, number, configuration))
+        best = heapq.nlargest(
+            keep,
+            [*best, *entries],
+            key=lambda entry: (entry[0], -entry[1])
+        )
+
+    return best
+
+
+def search(
+        space: dict[str, list[float | int]],
+        data: sweep.SweepData,
+        strategy: str,
+        metric: str,
+        is_metric_minimized: bool,
+        keep_top: int,
+        samples: int,
+        halving_factor: int,
+        seed: int,
+        max_workers: int
+    ) -> list[Entry]:
+    """Best configurations found with grid, random or halving search."""
+    if strategy == 'grid':
+        return evaluate(
+            enumerate(get_grid(space)),
+            data, metric, is_metric_minimized, keep_top, max_workers
+        )
+    if strategy == 'random':
+        return evaluate(
+            enumerate(get_random_sample(space, samples, seed)),
+            data, metric, is_metric_minimized, keep_top, max_workers
+        )
+    if strategy != 'halving':
+        raise ValueError(f'unknown sweep strategy: {strategy}')
+
+    candidates = list(enumerate(get_random_sample(space, samples, seed)))
+    rank_dates = sorted(
+        date for date in data.rank_input.date_slices
+        if date >= data.first_rank_date
+    )
+    rounds = get_halving_rounds(len(candidates), keep_top, halving_factor)
+    windows = get_halving_windows(rank_dates, rounds, halving_factor)
+    for n, first_rank_date in enumerate(windows):
+        keep = max(keep_top, math.ceil(len(candidates) / halving_factor))
+        best = evaluate(
+            candidates, data, metric, is_metric_minimized, keep, max_workers,
+            first_rank_date=None if n == rounds - 1 else first_rank_date
+        )
+        logging.info(
+            f'halving round {n + 1}/{rounds} from {first_rank_date}: '
+            f'{len(candidates)} configurations, {len(best)} kept.'
+        )
+        candidates = [(number, configuration) for _, number, configuration in best]
+
+    return best
+
+
+def main(first_rank_date: str) -> tuple[list[sweep.Scenario], sweep.SweepData]:
+    """
+    Search scoring weights, top and fee, return best scenarios
+    and loaded sweep data to backtest them with.
+    """
+
+    with open('config.toml', 'rb') as file:
+        config = tomllib.load(file)
+
+    TOP = config['portfolio']['top']
+    PTF_NAME = config['portfolio']['investment_name']
+    SCORING = config['scoring']
+    TRANSACTION_FEE = config['replacement']['transaction_fee']
+    MAX_WORKERS = config['backtest']['max_workers']
+
+    STRATEGY = config['sweep']['strategy']
+    METRIC = config['sweep']['metric']
+    IS_METRIC_MINIMIZED = config['sweep']['is_metric_minimized']
+    KEEP_TOP = config['sweep']['keep_top']
+    SAMPLES = config['sweep']['samples']
+    HALVING_FACTOR = config['sweep']['halving_factor']
+    SEED = config['sweep']['seed']
+    RANGES = config['sweep']['ranges']
+
+    space = get_parameters_space(RANGES, SCORING, TOP, TRANSACTION_FEE)
+    logging.info(
+        f'{STRATEGY} search of {get_space_size(space)} configurations space.'
+    )
+
+    sweep_data = sweep.load_sweep_data(config, first_rank_date)
+
+    best = search(
+        space,
+        sweep_data,
+        strategy=STRATEGY,
+        metric=METRIC,
+        is_metric_minimized=IS_METRIC_MINIMIZED,
+        keep_top=KEEP_TOP,
+        samples=SAMPLES,
+        halving_factor=HALVING_FACTOR,
+        seed=SEED,
+        max_workers=MAX_WORKERS
+    )
+
+    scenarios = [
+        get_scenario(configuration, number, PTF_NAME)
+        for _, number, configuration in best
+    ]
+    leaderboard = pd.DataFrame(
+        [
+            {
+                **configuration,
+                METRIC: (
+                    float('nan') if score == -math.inf
+                    else -score if IS_METRIC_MINIMIZED else score
+                )
+            } for score, _, configuration in best
+        ],
+        index=[scenario.name for scenario in scenarios]
+    )
+    print(leaderboard.to_string())
+
+    return scenarios, sweep_data
@@ -0,0 +1,234 @@
+from typing import Iterable
+from dataclasses import dataclass, field
+from enum import IntEnum
+import pandas as pd
+import numpy as np
+from prices.matrix import PriceMatrix
+
+
+class Side(IntEnum):
+    BUY = 1
+    SELL = -1
+
+
+class Reason(IntEnum):
+    """Why the transaction was made"""
+    REPLACE = 0
+    STOPPED = 1
+    REBALANCE = 2
+
+
+# Transactions ledger record: dates' row, symbols' position, side, gross
+# value of shares traded, fee and reason.
+TRANSACTION_DTYPE = np.dtype([
+    ('date', np.int32),
+    ('ticker_code', np.int32),
+    ('side', np.int8),
+    ('shares_value', np.float64),
+    ('fee', np.float64),
+    ('reason', np.int8),
+])
+
+
+def align_open_prices(
+        prices: PriceMatrix,
+        ptf_dates: list[str],
+        symbols: Iterable[str]
+    ) -> np.ndarray:
+    """Open prices (dates x symbols) for portfolio dates and symbols."""
+    rows = prices.date_labels.get_indexer(ptf_dates)
+    columns = [prices.columns.get(symbol, -1) for symbol in symbols]
+    open_prices = prices.open[np.ix_(rows, columns)]
+    # dates or symbols missing in prices
+    open_prices[rows == -1, :] = np.nan
+    open_prices[:, np.array(columns, dtype=np.intp) == -1] = np.nan
+
+    return open_prices
+
+
+@dataclass
+class SimulationResult:
+    """
+    Portfolio simulation arrays, dates x symbols ones are NaN
+    where the symbol does not apply that day.
+    """
+    dates: list[str]
+    symbols: tuple[str, ...]
+    # after the day's transactions
+    holdings: np.ndarray
+    # open prices and returns of symbols held since the previous day
+    prices: np.ndarray
+    returns: np.ndarray
+    # positions' value and share in invested capital
+    capital: np.ndarray
+    shares: np.ndarray
+    # portfolio level series
+    summary: pd.DataFrame
+    # value of positions traded on transaction days before replacing
+    traded_capital: np.ndarray
+    # transactions' records (TRANSACTION_DTYPE) in order of execution, the
+    # first transactions_count of them recorded, the rest preallocated
+    ledger: np.ndarray = field(
+        default_factory=lambda: np.empty(0, dtype=TRANSACTION_DTYPE)
+    )
+    transactions_count: int = 0
+
+    def add_transactions(
+            self,
+            date: int,
+            tickers: np.ndarray,
+            side: Side,
+            shares_values: np.ndarray | float,
+            fees: np.ndarray | float,
+            reason: Reason
+        ) -> None:
+        """Record transactions of tickers (symbols' positions) on date row."""
+        count = self.transactions_count + len(tickers)
+        if count > len(self.ledger):
+            ledger = np.empty(
+                max(count, 2 * len(self.ledger)), dtype=TRANSACTION_DTYPE
+            )
+            ledger[:self.transactions_count] = self.transactions
+            self.ledger = ledger
+        transactions = self.ledger[self.transactions_count:count]
+        transactions['date'] = date
+        transactions['ticker_code'] = tickers
+        transactions['side'] = side
+        transactions['shares_value'] = shares_values
+        transactions['fee'] = fees
+        transactions['reason'] = reason
+        self.transactions_count = count
+
+    @property
+    def transactions(self) -> np.ndarray:
+        """All transactions record array (TRANSACTION_DTYPE)."""
+        return self.ledger[:self.transactions_count]
+
+    def get_transactions_table(self) -> pd.DataFrame:
+        """Transactions with dates, symbols, sides and reasons' names."""
+        transactions = self.transactions
+        return pd.DataFrame({
+            'date': np.asarray(self.dates, dtype=object)[transactions['date']],
+            'ticker': np.asarray(self.symbols, dtype=object)[
+                transactions['ticker_code']
+            ],
+            'side': [Side(side).name.lower() for side in transactions['side']],
+            'shares_value': transactions['shares_value'],
+            'fee': transactions['fee'],
+            'reason': [
+                Reason(reason).name.lower() for reason in transactions['reason']
+            ],
+        })
+
+    def _get_tickers_by_date(self, transactions: np.ndarray) -> dict[int, list[str]]:
+        """Date row -> symbols of transactions sorted by symbols' position."""
+        transactions = transactions[
+            np.lexsort((transactions['ticker_code'], transactions['date']))
+        ]
+        tickers = {}
+        for date, ticker in zip(
+                transactions['date'].tolist(),
+                transactions['ticker_code'].tolist()
+            ):
+            tickers.setdefault(date, []).append(self.symbols[ticker])
+
+        return tickers
+
+    def _symbols_frame(self, data: np.ndarray, suffix: str) -> pd.DataFrame:
+        """Frame with columns ordered by symbols' first appearance."""
+        present = ~np.isnan(data)
+        columns = np.flatnonzero(present.any(axis=0))
+        first_rows = present[:, columns].argmax(axis=0)
+        columns = columns[np.lexsort((columns, first_rows))]
+
+        return pd.DataFrame(
+            data[:, columns],
+            index=self.dates,
+            columns=[f'{self.symbols[n]}{suffix}' for n in columns]
+        )
+
+    def get_tickers_details(self) -> pd.DataFrame:
+        """
+        Long table of tickers' open price, returns, capital and share in
+        portfolio, one row per date and ticker with any of them.
+        """
+        values = {
+            'price': self.prices,
+            'return': self.returns,
+            'capital': self.capital,
+            'share': self.shares,
+        }
+        is_present = np.zeros(self.holdings.shape, dtype=bool)
+        for data in values.values():
+            is_present |= ~np.isnan(data)
+        rows, columns = np.nonzero(is_present)
+
+        return pd.DataFrame({
+            'date': np.asarray(self.dates, dtype=object)[rows],
+            'ticker': np.asarray(self.symbols, dtype=object)[columns],
+            **{name: data[rows, columns] for name, data in values.items()},
+        })
+
+    def to_frames(self) -> tuple[pd.DataFrame, ...]:
+        """
+        Portfolio table, tickers' details (long table), tickers' share
+        in portfolio (one row per date) and transactions table.
+        """
+        ptf = self.summary.copy()
+        held = [
+            [self.symbols[n] for n in np.flatnonzero(row)]
+            for row in self.holdings
+        ]
+        ptf.insert(ptf.columns.get_loc('stocks_in_ptf') + 1, 'tickers', held)
+
+        def by_row(values: dict[int, object]) -> list[object]:
+            return [values.get(n, np.nan) for n in range(len(self.dates))]
+
+        # Replacement details formatted from the ledger
+        transactions = self.transactions
+        is_sell = transactions['side'] == Side.SELL
+        is_replace = transactions['reason'] == Reason.REPLACE
+        is_sold = (
+            is_sell
+            & (transactions['reason'] != Reason.REBALANCE)
+            & ~self.holdings[transactions['date'], transactions['ticker_code']]
+        )
+        ptf['sold'] = by_row(self._get_tickers_by_date(transactions[is_sold]))
+        ptf['bought'] = by_row(
+            self._get_tickers_by_date(transactions[~is_sell & is_replace])
+        )
+
+        sells = transactions[is_sell & is_replace]
+        traded_capital = self.traded_capital[sells['date']]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            released_shares = np.where(
+                traded_capital != 0,
+                (sells['shares_value'] - sells['fee']) / traded_capital,
+                np.nan
+            )
+        # Released shares in symbols' order, the previous per day loop went
+        # in set iteration order: averages may differ by the last digit.
+        to_sell_share = {}
+        for date in np.unique(sells['date']).tolist():
+            rows = sells['date'] == date
+            to_sell_share[date] = (
+                [self.symbols[ticker] for ticker in sells['ticker_code'][rows]],
+                released_shares[rows]
+            )
+        ptf['to_sell_share'] = by_row({
+            n: {
+                ticker: f'{share:.1%}'
+                for ticker, share in zip(tickers, shares)
+            } for n, (tickers, shares) in to_sell_share.items()
+        })
+        ptf['to_sell_average_share'] = by_row({
+            n: f'{np.average(shares):.2%}'
+            for n, (_, shares) in to_sell_share.items()
+        })
+
+        return (
+            ptf,
+            self.get_tickers_details(),
+            self._symbols_frame(self.shares, ''),
+            self.get_transactions_table(),
+        )
@@ -1,265 +1,308 @@
-from typing import Iterable
 import logging
 import pandas as pd
 import numpy as np
+from prices.matrix import PriceMatrix
+from backtests import simulation
+from backtests.dates.holdings import Holdings
 
 pd.set_option('future.no_silent_downcasting', True)
 
 
 def compute_ptf_performance(
-        stocks_dates_in_ptf: dict[str, Iterable[str]],
-        ptf_dates: Iterable[str],
-        stocks_prices: dict[str, dict[str, float | None]],
+        ptf_holdings: Holdings,
+        stocks_prices: PriceMatrix,
         first_trading_dates_of_month: list[str],
         is_rebalanced: bool,
         transaction_fee: float,
         init_capital: float,
-    ) -> Iterable[pd.DataFrame]:
+    ) -> simulation.SimulationResult:
     """
-    Compute ptf returns based on strategy applied.
+    Compute ptf returns based on strategy applied (portfolio table
+    in summary, formatted tables with to_frames).
     """
+    return simulate_ptf(
+        ptf_holdings,
+        stocks_prices,
+        first_trading_dates_of_month,
+        is_rebalanced,
+        transaction_fee,
+        init_capital,
+    )
 
-    cap_invested: float = init_capital
-    tickers = []
-    tickers_cap= {}
-    free_cash: float = 0
-    ptf = {}
-    # Informative:
-    price_in_ptf = {}
-    returns_in_ptf = {}
-    cap_in_ptf = {}
-    share_in_ptf = {}
 
-    for n, date in enumerate(ptf_dates):
-        
-        if n == 0:
-            tickers = sorted([
-                ticker for ticker, dates in stocks_dates_in_ptf.items()
-                if date in dates
-                ])
-
-            ticker_init_cap = cap_invested / len(tickers)
-
-            tickers_cap= {
-                ticker: ticker_init_cap - (ticker_init_cap * transaction_fee)
-                for ticker in tickers
-            }
-            # Informative:
-            tick_price = {}
-            tick_returns = {}
-            tick_cap = {}
-            for ticker in tickers:
-                tick_price[f'{ticker}_open'] = stocks_prices[ticker][date]['Open']
-                tick_returns[f'{ticker}_ret'] = 0
-                tick_cap[f'{ticker}_cap'] = ticker_init_cap - (ticker_init_cap * transaction_fee)
-            
-            price_in_ptf[date] = tick_price
-            returns_in_ptf[date] = tick_returns
-            cap_in_ptf[date] = tick_cap
-            
-            share_in_ptf[date] = {
-                ticker: cap/cap_invested for ticker, cap in tickers_cap.items()
-            }
-
-            ptf[date] = {
-                    'invested': cap_invested,
-                    'returns_on_invested': 0,
-                    'free_cash': free_cash,
-                    'tickers': tickers,
-                    'sell_trans': 0,
-                    'buy_trans': len(tickers),
-                    'stocks_in_ptf': len(tickers),
-                    'replace_trans_costs': cap_invested * transaction_fee,
-                    'replace_trans_counts': len(tickers),
-                    'tickers_to_buy': tickers,
-                    'bought': tickers,
-            }
-
-            '''
-            Returns are computed from yesterday's open to today's open !!!
-            strategy applies actually from the init cap invested as it gets
-            adjusted next day morning.
-            '''
-        elif n > 0:
-
-            # RETURNS (timing: open on the day)
-            
-            tickers_new_cap = {}
-            replace_trans_costs: float = 0
-            replace_trans_count: int = 0
-            # Informative:
-            tick_price = {}
-            tick_returns = {}
-
-            for ticker in tickers:
-                try:
-                    start_cap = tickers_cap[ticker]
-                    start_price = stocks_prices[ticker][ptf_dates[n-1]]['Open']
-                except KeyError:
-                    logging.warning(f'{ticker} not in tickers cap on {date}')
-                try:
-                    end_price = stocks_prices[ticker][date]['Open']
-                except KeyError:
-                    stop_trans_cost = start_cap * transaction_fee
-                    free_cash += start_cap - stop_trans_cost
-                    replace_trans_costs += stop_trans_cost
-                    replace_trans_count +=1
-                    tickers_cap.pop(ticker)
-                    logging.warning(f'{ticker} stopped trading {ptf_dates[n-1]}')
-                    continue
-                
-                returns = end_price / start_price - 1
-
-                ticker_new_cap = start_cap + (start_cap * returns)
-                tickers_new_cap[ticker] = ticker_new_cap
-
-                # Informative:
-                tick_price[f'{ticker}_open'] = end_price
-                tick_returns[f'{ticker}_ret'] = returns
-                #tick_cap[f'{ticker}_cap'] = ticker_new_cap 
-                
-
-            cap_invested = sum(cap for cap in tickers_new_cap.values())
-
-            try:
-                returns_invested = (
-                    cap_invested / sum(cap for cap in tickers_cap.values()) - 1
-                    )
-            except ZeroDivisionError:
-                returns_invested = float(np.nan)
-                pass
-
-            tickers_cap = tickers_new_cap
-
-            new_tickers = sorted([
-                ticker for ticker, dates in stocks_dates_in_ptf.items()
-                if date in dates
-                ])
-
-            # SHOW POSITIONS' VALUE OF TICKERS TO SELL
-            tickers_to_sell_released_cap = {}
-
-            # REPLACE STOCKS IN PORTFOLIO
-            tickers_to_sell = set(tickers).difference(set(new_tickers))
-            tickers_to_buy = set(new_tickers).difference(set(tickers))
+def simulate_ptf(
+        ptf_holdings: Holdings,
+        stocks_prices: PriceMatrix,
+        first_trading_dates_of_month: list[str],
+        is_rebalanced: bool,
+        transaction_fee: float,
+        init_capital: float,
+    ) -> simulation.SimulationResult:
+    """
+    Simulate equal weight portfolio replacing stocks when they drop out
+    of dates in portfolio. Positions' values between transaction days are
+    computed with array operations, Python works on transaction days only.
 
-            if tickers_to_sell:
-                for ticker in tickers_to_sell:
-                    try:
-                        ticker_cap = tickers_cap[ticker]
-                        sell_trans_cost = ticker_cap * transaction_fee
-                        free_cash += ticker_cap - sell_trans_cost
-                    except KeyError:
-                        continue
+    Returns are computed from yesterday's open to today's open !!!
+    Strategy applies actually from the init cap invested as it gets
+    adjusted next day morning.
+    """
+    ptf_dates = ptf_holdings.dates
+    symbols = ptf_holdings.symbols
+    holdings = ptf_holdings.mask
+    prices = simulation.align_open_prices(stocks_prices, ptf_dates, symbols)
+    n_dates, n_symbols = holdings.shape
 
-                    # SHOW POSITIONS' VALUE OF TICKERS TO SELL
-                    try:
-                        tickers_to_sell_released_cap[ticker] = (
-                            (tickers_cap[ticker] - sell_trans_cost) / cap_invested
-                        )
-                    except ZeroDivisionError:
-                        tickers_to_sell_released_cap[ticker] = float(np.nan)
+    is_rebalance_date = np.zeros(n_dates, dtype=bool)
+    if is_rebalanced:
+        is_rebalance_date = np.isin(ptf_dates, first_trading_dates_of_month)
 
-                    replace_trans_costs += sell_trans_cost
-                    replace_trans_count += 1
-                    tickers_cap.pop(ticker)
-                cap_invested = sum(cap for cap in tickers_cap.values())
+    # RETURNS (timing: open on the day) of stocks held since yesterday
+    was_held = np.zeros_like(holdings)
+    was_held[1:] = holdings[:-1]
+    is_traded = was_held & ~np.isnan(prices)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.full((n_dates, n_symbols), np.nan)
+        returns[1:] = prices[1:] / prices[:-1] - 1
+    returns = np.where(is_traded, returns, np.nan)
+    shown_prices = np.where(is_traded, prices, np.nan)
+    # first day: all bought at open
+    returns[0] = np.where(holdings[0], 0, np.nan)
+    shown_prices[0] = np.where(holdings[0], prices[0], np.nan)
 
-            if tickers_to_buy:
-                capital_to_invest = free_cash / len(tickers_to_buy)
-                for ticker in tickers_to_buy:
-                    buy_trans_cost = capital_to_invest * transaction_fee
-                    tickers_cap.update({ticker: capital_to_invest - buy_trans_cost})
-                    replace_trans_costs += buy_trans_cost
-                    replace_trans_count += 1
-                free_cash = 0
-                cap_invested = sum(cap for cap in tickers_cap.values())
+    # Transaction days: portfolio changes, stocks stopped trading, rebalancing
+    is_stopped = was_held & np.isnan(prices)
+    is_event = (
+        (holdings != was_held).any(axis=1)
+        | is_stopped.any(axis=1)
+        | is_rebalance_date
+    )
+    is_event[0] = True
+    event_rows = np.flatnonzero(is_event)
 
-            # REBALANCE
-            rebalance_trans_costs: float = 0
-            rebalance_trans_count: int = 0
+    capital = np.full((n_dates, n_symbols), np.nan)
+    invested = np.zeros(n_dates)
+    free_cash = np.zeros(n_dates)
+    returns_on_invested = np.full(n_dates, np.nan)
+    counts = {
+        name: np.zeros(n_dates) for name in (
+            'sell_trans', 'buy_trans',
+            'replace_trans_counts', 'replace_trans_costs',
+            'rebal_trans_counts', 'rebal_trans_costs',
+        )
+    }
+    # Ledger preallocated for at most a transaction per portfolio change,
+    # stopped stock and stock held on rebalance date
+    max_transactions = (
+        np.count_nonzero(holdings != was_held)
+        + np.count_nonzero(is_stopped)
+        + np.count_nonzero(holdings[is_rebalance_date])
+    )
+    result = simulation.SimulationResult(
+        dates=ptf_dates,
+        symbols=symbols,
+        holdings=holdings,
+        prices=shown_prices,
+        returns=returns,
+        capital=capital,
+        shares=np.full((n_dates, n_symbols), np.nan),
+        summary=pd.DataFrame(),
+        traded_capital=np.full(n_dates, np.nan),
+        ledger=np.empty(max_transactions, dtype=simulation.TRANSACTION_DTYPE),
+    )
 
-            if is_rebalanced:
-                if date in first_trading_dates_of_month:
-                    ptf_cap = sum(cap for cap in tickers_cap.values())
-                    rebalanced_stock_cap = ptf_cap / len(tickers_cap)
-                    rebalanced_tickers_cap = {}
-                    for ticker, cap in tickers_cap.items():
-                        rebalanced_tickers_cap[ticker] = (
-                            rebalanced_stock_cap
-                            - (abs(cap - rebalanced_stock_cap) * transaction_fee)
-                        )
-                        rebalance_trans_costs += (
-                            abs(cap - rebalanced_stock_cap) * transaction_fee
-                        )
-                        rebalance_trans_count += 1
-                    tickers_cap = rebalanced_tickers_cap
-                    cap_invested = sum(cap for cap in tickers_cap.values())
-            
+    # FIRST DAY
+    tickers = np.flatnonzero(holdings[0])
+    ticker_init_cap = init_capital / len(tickers)
+    capital[0, tickers] = ticker_init_cap - (ticker_init_cap * transaction_fee)
+    invested[0] = init_capital
+    returns_on_invested[0] = 0
+    counts['buy_trans'][0] = len(tickers)
+    counts['replace_trans_counts'][0] = len(tickers)
+    counts['replace_trans_costs'][0] = init_capital * transaction_fee
+    counts['rebal_trans_counts'][0] = np.nan
+    counts['rebal_trans_costs'][0] = np.nan
+    result.add_transactions(
+        0, tickers, simulation.Side.BUY,
+        ticker_init_cap, ticker_init_cap * transaction_fee,
+        simulation.Reason.REPLACE
+    )
 
-            tickers = new_tickers
+    cash: float = 0
+    for event, next_event in zip(event_rows, [*event_rows[1:], n_dates]):
+        if event > 0:
+            cash, returns_on_invested[event] = _trade(
+                result, event, cash, counts,
+                is_stopped=is_stopped[event],
+                is_rebalance_date=is_rebalance_date[event],
+                transaction_fee=transaction_fee,
+            )
+            invested[event] = np.nansum(capital[event])
 
-            # Informative
-            price_in_ptf[date] = tick_price
-            returns_in_ptf[date] = tick_returns
-            cap_in_ptf[date] = {f'{ticker}_cap': cap for ticker, cap in tickers_cap.items()}
+        # Holding positions till next transaction day
+        tickers = np.flatnonzero(holdings[event])
+        days = slice(event + 1, next_event)
+        capital[days, tickers] = (
+            capital[event, tickers]
+            * prices[days, tickers] / prices[event, tickers]
+        )
+        free_cash[event:next_event] = cash
 
-            try:
-                share_in_ptf[date] = {
-                    ticker: cap/cap_invested for ticker, cap in tickers_cap.items()
-                }
-            except ZeroDivisionError:
-                share_in_ptf[date] = {}
+    no_event_rows = np.flatnonzero(~is_event)
+    invested[no_event_rows] = np.nansum(capital[no_event_rows], axis=1)
+    start_invested = np.nansum(capital[no_event_rows - 1], axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns_on_invested[no_event_rows] = np.where(
+            start_invested != 0,
+            invested[no_event_rows] / start_invested - 1,
+            np.nan
+        )
 
-            ptf[date] = {
-                'invested': cap_invested,
-                'returns_on_invested': returns_invested,
-                'free_cash': free_cash,
-                'tickers': tickers,
-                'sell_trans': len(tickers_to_sell),
-                'buy_trans': len(tickers_to_buy),
-                'stocks_in_ptf': len(tickers),
-                'replace_trans_costs': replace_trans_costs,
-                'replace_trans_counts': replace_trans_count,
-                'rebal_trans_costs': rebalance_trans_costs,
-                'rebal_trans_counts': rebalance_trans_count, 
-                'sold': sorted(tickers_to_sell) if tickers_to_sell else np.nan,
-                'bought': sorted(tickers_to_buy) if tickers_to_buy else np.nan,
-                'to_sell_share': {
-                    ticker: f"{share:.1%}"
-                      for ticker, share in tickers_to_sell_released_cap.items()
-                    } if tickers_to_sell_released_cap else np.nan,
-                'to_sell_average_share': f"{np.average(
-                    [share for share in tickers_to_sell_released_cap.values()]
-                    ):.2%}" if tickers_to_sell_released_cap else np.nan
-                }
-            
-    ptf_df = pd.DataFrame(ptf).transpose()
-    ptf_df['nav'] = ptf_df['invested'] + ptf_df['free_cash']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result.shares[:] = capital / invested[:, np.newaxis]
+    result.shares[invested == 0] = np.nan
 
-    ptf_df = ptf_df.loc[:, [
+    result.summary = pd.DataFrame({
+        'invested': invested,
+        'returns_on_invested': returns_on_invested,
+        'free_cash': free_cash,
+        'nav': invested + free_cash,
+        'stocks_in_ptf': holdings.sum(axis=1),
+        **counts,
+    }, index=ptf_dates)
+    result.summary = result.summary.loc[:, [
         'invested',
         'returns_on_invested',
         'free_cash',
         'nav',
         'stocks_in_ptf',
-        'tickers',
         'sell_trans',
         'buy_trans',
         'replace_trans_counts',
         'replace_trans_costs',
         'rebal_trans_counts',
         'rebal_trans_costs',
-        'sold',
-        'bought',
-        'to_sell_share',
-        'to_sell_average_share',
     ]]
 
-    return (
-        ptf_df,
-        pd.DataFrame(price_in_ptf).transpose(),
-        pd.DataFrame(returns_in_ptf).transpose(),
-        pd.DataFrame(cap_in_ptf).transpose(),
-        pd.DataFrame(share_in_ptf).transpose()
-    )
\ No newline at end of file
+    return result
+
+
+def _trade(
+        result: simulation.SimulationResult,
+        n: int,
+        cash: float,
+        counts: dict[str, np.ndarray],
+        is_stopped: np.ndarray,
+        is_rebalance_date: bool,
+        transaction_fee: float,
+    ) -> tuple[float, float]:
+    """
+    Apply transaction day n: move positions to open prices, release cash
+    of stopped stocks, replace stocks and rebalance.
+    Returns free cash and returns on invested capital.
+    """
+    symbols = result.symbols
+    capital = result.capital
+    held = np.flatnonzero(result.holdings[n - 1])
+    traded = held[~is_stopped[held]]
+
+    replace_trans_costs: float = 0
+    replace_trans_count: int = 0
+
+    stopped = held[is_stopped[held]]
+    for ticker in stopped:
+        start_cap = capital[n - 1, ticker]
+        stop_trans_cost = start_cap * transaction_fee
+        cash += start_cap - stop_trans_cost
+        replace_trans_costs += stop_trans_cost
+        replace_trans_count += 1
+        logging.warning(
+            f'{symbols[ticker]} stopped trading {result.dates[n - 1]}'
+        )
+    result.add_transactions(
+        n, stopped, simulation.Side.SELL,
+        capital[n - 1, stopped], capital[n - 1, stopped] * transaction_fee,
+        simulation.Reason.STOPPED
+    )
+
+    start_cap = capital[n - 1, traded]
+    capital[n, traded] = start_cap + start_cap * result.returns[n, traded]
+    cap_invested = capital[n, traded].sum()
+    returns_invested = (
+        cap_invested / start_cap.sum() - 1 if start_cap.sum() else float(np.nan)
+    )
+
+    # REPLACE STOCKS IN PORTFOLIO
+    tickers_to_sell = np.flatnonzero(
+        result.holdings[n - 1] & ~result.holdings[n]
+    )
+    tickers_to_buy = np.flatnonzero(
+        result.holdings[n] & ~result.holdings[n - 1]
+    )
+
+    # Positions' value of tickers to sell is shown against cap_invested
+    result.traded_capital[n] = cap_invested
+    sold = tickers_to_sell[~is_stopped[tickers_to_sell]]
+    result.add_transactions(
+        n, sold, simulation.Side.SELL,
+        capital[n, sold], capital[n, sold] * transaction_fee,
+        simulation.Reason.REPLACE
+    )
+    for ticker in sold:
+        ticker_cap = capital[n, ticker]
+        sell_trans_cost = ticker_cap * transaction_fee
+        cash += ticker_cap - sell_trans_cost
+        replace_trans_costs += sell_trans_cost
+        replace_trans_count += 1
+        capital[n, ticker] = np.nan
+
+    if len(tickers_to_buy):
+        capital_to_invest = cash / len(tickers_to_buy)
+        buy_trans_cost = capital_to_invest * transaction_fee
+        capital[n, tickers_to_buy] = capital_to_invest - buy_trans_cost
+        replace_trans_costs += buy_trans_cost * len(tickers_to_buy)
+        replace_trans_count += len(tickers_to_buy)
+        cash = 0
+        result.add_transactions(
+            n, tickers_to_buy, simulation.Side.BUY,
+            capital_to_invest, buy_trans_cost,
+            simulation.Reason.REPLACE
+        )
+
+    # REBALANCE
+    rebalance_trans_costs: float = 0
+    rebalance_trans_count: int = 0
+
+    if is_rebalance_date:
+        tickers = np.flatnonzero(result.holdings[n])
+        tickers_cap = capital[n, tickers]
+        rebalanced_stock_cap = tickers_cap.sum() / len(tickers)
+        rebalance_costs = (
+            np.abs(tickers_cap - rebalanced_stock_cap) * transaction_fee
+        )
+        is_bought = tickers_cap < rebalanced_stock_cap
+        is_sold = tickers_cap > rebalanced_stock_cap
+        result.add_transactions(
+            n, tickers[is_bought], simulation.Side.BUY,
+            rebalanced_stock_cap - tickers_cap[is_bought],
+            rebalance_costs[is_bought],
+            simulation.Reason.REBALANCE
+        )
+        result.add_transactions(
+            n, tickers[is_sold], simulation.Side.SELL,
+            tickers_cap[is_sold] - rebalanced_stock_cap,
+            rebalance_costs[is_sold],
+            simulation.Reason.REBALANCE
+        )
+        capital[n, tickers] = rebalanced_stock_cap - rebalance_costs
+        rebalance_trans_costs = rebalance_costs.sum()
+        rebalance_trans_count = len(tickers)
+
+    counts['sell_trans'][n] = len(tickers_to_sell)
+    counts['buy_trans'][n] = len(tickers_to_buy)
+    counts['replace_trans_costs'][n] = replace_trans_costs
+    counts['replace_trans_counts'][n] = replace_trans_count
+    counts['rebal_trans_costs'][n] = rebalance_trans_costs
+    counts['rebal_trans_counts'][n] = rebalance_trans_count
+
+    return cash, returns_invested
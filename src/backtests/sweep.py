@@ -0,0 +1,309 @@
+from typing import Any, Iterable, Optional
+from dataclasses import dataclass, field
+from functools import partial
+import importlib
+import json
+import math
+import os
+import pandas as pd
+from libs.helpers.interfaces import ReplaceIntervals
+from libs.helpers import workers
+from symbols import getters as symb_proc
+from prices import matrix
+from prices import getters as prices_get
+from prices.matrix import PriceMatrix
+from prices.calendar import TradingCalendar
+from ranks.esr import rank
+from ranks.esr import processors as rank_proc
+from ranks.esr import store as rank_store
+from backtests.dates import period_first_dates
+from backtests import benchmark, investment
+
+# Scenarios ranked together in one pass by a worker.
+RANK_BATCH_SIZE = 32
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """Portfolio settings of a single backtest."""
+    name: str
+    score_weights: dict[str, float]
+    top: int
+    transaction_fee: float
+    # overrides first rank date of the sweep, e.g. to backtest shorter period
+    first_rank_date: Optional[str] = None
+
+
+@dataclass
+class SweepData:
+    """Inputs shared read-only by all scenarios."""
+    rank_input: rank.RankInput
+    price_matrix: PriceMatrix
+    # Index tickers by period end date
+    period_tickers: dict[str, list[str]]
+    # Trading calendar of price matrix' dates
+    calendar: TradingCalendar
+    first_rank_date: str
+    investment_name: str
+    rank_strategy: str
+    rank_interval: str
+    replace_strategy: str
+    is_rebalanced: bool
+    is_rank_sma_filtered: bool
+    is_rank_rs_limited: bool
+    rs_limit: int
+    init_capital: float
+    periods_per_year: int
+
+
+@dataclass
+class ScenarioResult:
+    """Backtest output of a scenario (metrics only if not detailed)."""
+    name: str
+    metrics: dict[str, float | None] = field(default_factory=dict)
+    ranked_data: Optional[dict[str, pd.DataFrame]] = None
+    backtest: Optional[pd.DataFrame] = None
+    drawdowns_stats: Optional[pd.DataFrame] = None
+    tickers_share_in_ptf_stats: Optional[pd.DataFrame] = None
+    # date, ticker, price, return, capital and share rows
+    tickers_infos: Optional[pd.DataFrame] = None
+    transactions: Optional[pd.DataFrame] = None
+    ptf_all_dates: Optional[list[str]] = None
+    m_first_trading_dates: Optional[list[str]] = None
+    y_first_trading_dates: Optional[list[str]] = None
+
+
+def load_sweep_data(config: dict[str, Any], first_rank_date: str) -> SweepData:
+    """
+    Load prices and rank input data of portfolio tickers (binary rank
+    input store if present, JSON file otherwise) from first rank date on.
+    """
+    rank_strategy = config['rank']['strategy']
+    replacement_frequency = config['replacement']['frequency']
+    if replacement_frequency == ReplaceIntervals.MONTHLY:
+        rank_interval = 'monthly'
+    elif replacement_frequency == ReplaceIntervals.WEEKLY:
+        rank_interval = 'weekly'
+
+    with open(config['repo_files']['period_tickers']) as file:
+        period_tickers: dict[str, list[str]] = (json.load(file))
+
+    all_tickers = symb_proc.get_all_ptf_tickers(period_tickers)
+
+    price_matrix = matrix.get_price_matrix_from_db(
+        [
+            *all_tickers,
+            config['portfolio']['benchmark'],
+            *prices_get.get_price_tickers(
+                config['portfolio']['extra_benchmarks']
+            )
+        ],
+        config['repo_files']['db']
+    )
+
+    rank_input_path = os.path.join(
+        config['repo_files']['path'],
+        f'rank_input_data_{rank_strategy}_{rank_interval}'
+    )
+    if os.path.isdir(rank_input_path):
+        rank_input_data = rank_store.load_rank_input(
+            rank_input_path, start_date=first_rank_date
+        )
+    else:
+        with open(f'{rank_input_path}.json') as file:
+            rank_input_data = {
+                date: stocks_data
+                for date, stocks_data in json.load(file).items()
+                if date >= first_rank_date
+            }
+
+    return SweepData(
+        rank_input=rank.get_rank_input(rank_input_data),
+        price_matrix=price_matrix,
+        period_tickers=period_tickers,
+        calendar=TradingCalendar.from_price_matrix(price_matrix),
+        first_rank_date=first_rank_date,
+        investment_name=config['portfolio']['investment_name'],
+        rank_strategy=rank_strategy,
+        rank_interval=rank_interval,
+        replace_strategy=config['replacement']['replace_strategy'],
+        is_rebalanced=config['performance']['is_rebalanced'],
+        is_rank_sma_filtered=config['rank']['is_rank_sma_filtered'],
+        is_rank_rs_limited=config['rank']['is_rank_rs_limited'],
+        rs_limit=config['rank']['rs_limit'],
+        init_capital=config['portfolio']['initial_capital'],
+        periods_per_year=config['performance']['periods_per_year'],
+    )
+
+
+def get_scenario(
+        weights: Iterable[float],
+        score_weights: dict[str, float],
+        investment_name: str,
+        top: int,
+        transaction_fee: float
+    ) -> Scenario:
+    """Scenario of eps, sales and price ranks' weights triple."""
+    eps_weight, sales_weight, price_weight = list(weights)[:3]
+    return Scenario(
+        name=(
+            f'{investment_name.upper()}_{eps_weight*100:.0f}-'
+            f'{sales_weight*100:.0f}-{price_weight*100:.0f}'
+        ),
+        score_weights={
+            **score_weights,
+            'eps_rank': eps_weight,
+            'sales_rank': sales_weight,
+            'price_rank': price_weight,
+        },
+        top=top,
+        transaction_fee=transaction_fee,
+    )
+
+
+def run_scenario(
+        scenario: Scenario,
+        is_detailed: bool = True,
+        ranked: Optional[pd.DataFrame] = None
+    ) -> ScenarioResult:
+    """
+    Rank (unless ranked already), select and simulate portfolio
+    of the scenario. Not detailed result holds backtest data only,
+    metrics are computed for the batch of scenarios.
+    """
+    data: SweepData = workers.get_shared()
+
+    if ranked is None:
+        ranked = rank.compute_ranks(data.rank_input, [scenario.score_weights])[0]
+    ranked_data = rank_proc.limit_ranked_data_from_start_date(
+        ranked_data=rank.split_by_date(ranked, data.rank_input),
+        first_ranking_date=scenario.first_rank_date or data.first_rank_date
+    )
+    ranked_data: dict[str, pd.DataFrame] = {
+        date: ranked_data[date] for date in sorted(ranked_data)
+    }
+
+    dates_in_ptf_module = importlib.import_module(
+        name=f'.dates_{data.rank_interval}',
+        package='backtests.dates.dates_in_ptf_plugins'
+    )
+    ptf_holdings = dates_in_ptf_module.get_holdings_in_ptf(
+        ranked_data,
+        data.price_matrix,
+        data.calendar,
+        number_of_top_stocks=scenario.top,
+        is_ranking_sma_filtered=data.is_rank_sma_filtered,
+        is_ranking_rs_limited=data.is_rank_rs_limited,
+        rs_limit=data.rs_limit
+    )
+
+    ptf_all_dates = ptf_holdings.dates
+    ptf_calendar = TradingCalendar.from_dates(ptf_all_dates)
+    m_first_trading_dates = period_first_dates.get_first_trading_dates_of_month(
+        ranked_data=ranked_data,
+        calendar=ptf_calendar
+    )
+    y_first_trading_dates = period_first_dates.get_first_trading_dates_of_year(
+        ranked_data=ranked_data,
+        calendar=ptf_calendar
+    )
+
+    strategy_module = importlib.import_module(
+        name=f'.strategy_{data.replace_strategy}',
+        package=f'backtests.strategies.{data.rank_strategy}.strategy_plugins'
+    )
+    simulation_result = strategy_module.compute_ptf_performance(
+        ptf_holdings,
+        data.price_matrix,
+        m_first_trading_dates,
+        is_rebalanced=data.is_rebalanced,
+        transaction_fee=scenario.transaction_fee,
+        init_capital=data.init_capital,
+    )
+
+    # Metrics need only the portfolio table, not the formatted ones
+    if not is_detailed:
+        return ScenarioResult(
+            name=scenario.name, backtest=simulation_result.summary
+        )
+
+    backtest_data, tickers_infos, tickers_share_in_ptf, transactions = (
+        simulation_result.to_frames()
+    )
+    invest = investment.Investment(
+        name=data.investment_name,
+        backtest_data=backtest_data,
+        periods_per_year=data.periods_per_year
+    )
+    return ScenarioResult(
+        name=scenario.name,
+        ranked_data=ranked_data,
+        backtest=pd.concat([
+            backtest_data, invest.returns, invest.drawdowns
+        ], axis=1),
+        drawdowns_stats=invest.drawdowns_stats,
+        tickers_share_in_ptf_stats=investment.get_tickers_share_in_pft_stats(
+            tickers_share_in_ptf=tickers_share_in_ptf
+        ),
+        tickers_infos=tickers_infos,
+        transactions=transactions,
+        ptf_all_dates=ptf_all_dates,
+        m_first_trading_dates=m_first_trading_dates,
+        y_first_trading_dates=y_first_trading_dates,
+    )
+
+
+def run_scenarios_batch(
+        scenarios: list[Scenario], is_detailed: bool = True
+    ) -> list[ScenarioResult]:
+    """
+    Rank batch of scenarios in one pass, backtest each of them
+    and compute metrics of all of them at once.
+    """
+    data: SweepData = workers.get_shared()
+    ranks = rank.compute_ranks(
+        data.rank_input, [scenario.score_weights for scenario in scenarios]
+    )
+    results = [
+        run_scenario(scenario, is_detailed, ranked)
+        for scenario, ranked in zip(scenarios, ranks)
+    ]
+    metrics = investment.MetricsBatch.from_backtests(
+        {result.name: result.backtest for result in results},
+        data.periods_per_year
+    ).metrics
+    for result in results:
+        result.metrics = metrics.loc[:, result.name].to_dict()
+        if not is_detailed:
+            result.backtest = None
+
+    return results
+
+
+def run_scenarios(
+        scenarios: Iterable[Scenario],
+        data: SweepData,
+        max_workers: int = 0,
+        is_detailed: bool = True
+    ) -> list[ScenarioResult]:
+    """
+    Run scenarios across worker processes (0 - all cores) in batches
+    ranked in one pass, results in scenarios' order. Workers get shared
+    data once (see workers.map_with_shared).
+    """
+    scenarios = list(scenarios)
+    if not scenarios:
+        return []
+    max_workers = min(max_workers or os.cpu_count() or 1, len(scenarios))
+    batch_size = min(RANK_BATCH_SIZE, math.ceil(len(scenarios) / max_workers))
+    batches = [
+        scenarios[n:n + batch_size]
+        for n in range(0, len(scenarios), batch_size)
+    ]
+    run = partial(run_scenarios_batch, is_detailed=is_detailed)
+
+    return [
+        result
+        for results in workers.map_with_shared(run, batches, data, max_workers)
+        for result in results
+    ]
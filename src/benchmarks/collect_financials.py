@@ -0,0 +1,154 @@
+"""
+Wall time of collecting financial statements from a local stub http server
+with injected latency: serial requests (as collected before) against
+concurrent collection with several concurrency and rate limit settings.
+
+Run from src folder:
+    python -m benchmarks.collect_financials --tickers 300 --latency 0.05
+"""
+from typing import Callable, Optional
+import argparse
+import asyncio
+import logging
+import threading
+import time
+import requests
+from aiohttp import web
+from api import http_get
+from financials import getters as fin_get
+
+SECTIONS = ('income_statements', 'balance_sheets', 'earning_calendars')
+
+
+def start_stub_server(latency: float) -> tuple[str, Callable[[], None]]:
+    """
+    Start http server answering /{section}/{symbol} with a small
+    statement after latency seconds, in its own thread and event loop.
+    Returns base url and function stopping the server.
+    """
+    loop = asyncio.new_event_loop()
+
+    async def handle(request: web.Request) -> web.Response:
+        await asyncio.sleep(latency)
+        return web.json_response(
+            [{'symbol': request.match_info['symbol'], 'revenue': 1.0}]
+        )
+
+    async def start() -> tuple[web.AppRunner, int]:
+        app = web.Application()
+        app.router.add_get('/{section}/{symbol}', handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', 0).start()
+        return runner, runner.addresses[0][1]
+
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    runner, port = asyncio.run_coroutine_threadsafe(start(), loop).result()
+
+    def stop() -> None:
+        asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+    return f'http://127.0.0.1:{port}', stop
+
+
+def get_url_fns(
+        base_url: str
+    ) -> dict[str, tuple[Callable[[str, int], str], int]]:
+    """Statement section name -> (url function, limit) of stub server."""
+    def get_url_fn(section: str) -> Callable[[str, int], str]:
+        return lambda symbol, limit: f'{base_url}/{section}/{symbol}'
+
+    return {section: (get_url_fn(section), 1) for section in SECTIONS}
+
+
+def collect_serially(tickers: list[str], base_url: str) -> float:
+    """Wall time of getting sections one ticker after another."""
+    start = time.perf_counter()
+    for url_fn, limit in get_url_fns(base_url).values():
+        for ticker in tickers:
+            with requests.Session() as session:
+                response = session.get(url_fn(symbol=ticker, limit=limit))
+                response.raise_for_status()
+                response.json()
+
+    return time.perf_counter() - start
+
+
+def collect_concurrently(
+        tickers: list[str],
+        base_url: str,
+        max_connections: int,
+        requests_per_minute: Optional[int]
+    ) -> float:
+    """Wall time of getting all sections with http client."""
+    async def collect() -> None:
+        async with http_get.HttpClient(
+            max_connections=max_connections,
+            max_connections_per_host=max_connections,
+            requests_per_minute=requests_per_minute,
+        ) as client:
+            data = await fin_get.get_raw_financial_data_concurrently(
+                all_tickers=tickers,
+                url_fns=get_url_fns(base_url),
+                client=client
+            )
+        if any(len(data[section]) != len(tickers) for section in SECTIONS):
+            raise RuntimeError(f'missing responses: {client.summary.failed}')
+
+    start = time.perf_counter()
+    asyncio.run(collect())
+
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--tickers', type=int, default=200)
+    parser.add_argument(
+        '--latency', type=float, default=0.05,
+        help='server response latency in seconds'
+    )
+    parser.add_argument(
+        '--concurrency', type=int, nargs='+', default=[1, 10, 50],
+        help='max concurrent requests settings to compare'
+    )
+    parser.add_argument(
+        '--rpm', type=int, nargs='*', default=[0, 6000],
+        help='requests per minute settings to compare (0 - no limit)'
+    )
+    parser.add_argument(
+        '--skip_serial', action='store_true',
+        help='skip serial requests run (slow with many tickers)'
+    )
+    args = parser.parse_args()
+
+    tickers = [f'T{n:04d}' for n in range(args.tickers)]
+    requests_count = len(tickers) * len(SECTIONS)
+    base_url, stop_server = start_stub_server(args.latency)
+    logging.info(
+        f'{requests_count} requests, server latency {args.latency:.3f}s'
+    )
+    try:
+        if not args.skip_serial:
+            wall_time = collect_serially(tickers, base_url)
+            logging.info(f'serial: {wall_time:.2f}s')
+        for concurrency in args.concurrency:
+            for rpm in args.rpm:
+                wall_time = collect_concurrently(
+                    tickers, base_url, concurrency, rpm or None
+                )
+                logging.info(
+                    f'concurrency {concurrency}, '
+                    f'requests per minute {rpm or "unlimited"}: '
+                    f'{wall_time:.2f}s ({requests_count / wall_time:.0f} req/s)'
+                )
+    finally:
+        stop_server()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
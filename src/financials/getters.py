@@ -1,26 +1,37 @@
 from typing import Iterable, Callable
 import logging
-import requests
 
 from api import http_get
 
 logging.basicConfig(level=logging.INFO)
 
 
-def get_raw_financial_data(
+async def get_raw_financial_data_concurrently(
         all_tickers: Iterable[str],
-        url_fn: Callable[[str, int], str],
-        fs_limit: int
-    ) -> list[list[dict]]:
-    """Get financial statement section."""
-    data: list[list[dict]] = []
-    for ticker in all_tickers:
-        try:
-            response_data = http_get.http_get_sync(
-                url_fn(symbol=ticker, limit=fs_limit)
-            )
-            data.append(response_data)
-        except (requests.exceptions.HTTPError, AttributeError):
-            continue
-    
-    return data
\ No newline at end of file
+        url_fns: dict[str, tuple[Callable[[str, int], str], int]],
+        client: http_get.HttpClient
+    ) -> dict[str, list[list[dict]]]:
+    """
+    Get all financial statement sections for all tickers concurrently.
+
+    :param url_fns: statement section name -> (url function, limit)
+    :return: statement section name -> data in tickers' order
+    """
+    tickers = tuple(all_tickers)
+    sections = tuple(url_fns)
+    urls = [
+        url_fn(symbol=ticker, limit=fs_limit)
+        for url_fn, fs_limit in url_fns.values()
+        for ticker in tickers
+    ]
+    responses = await client.get_many(urls)
+
+    data: dict[str, list[list[dict]]] = {}
+    for n, section in enumerate(sections):
+        section_responses = responses[n * len(tickers):(n + 1) * len(tickers)]
+        data[section] = [
+            response_data for response_data in section_responses
+            if response_data is not None
+        ]
+
+    return data
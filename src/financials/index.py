@@ -1,8 +1,9 @@
 from typing import Iterable
 import logging
+import asyncio
 import tomllib
 import json
-from api import fmp
+from api import fmp, http_get
 from symbols import getters as symb_get
 from symbols import cleaners as symb_clean
 from financials import getters as fin_get
@@ -33,31 +34,41 @@ def main() -> None:
 
     urls = fmp.EndPoints()
 
-    is_data = fin_get.get_raw_financial_data(
-        all_tickers=all_tickers,
-        url_fn=urls.get_url_income_statement,
-        fs_limit=FS_LIMIT
-    )
+    async def collect() -> dict[str, list[list[dict]]]:
+        async with http_get.HttpClient.from_config(config['collect']) as client:
+            data = await fin_get.get_raw_financial_data_concurrently(
+                all_tickers=all_tickers,
+                url_fns={
+                    'income_statements': (
+                        urls.get_url_income_statement, FS_LIMIT
+                    ),
+                    'balance_sheets': (
+                        urls.get_url_balance_sheets, FS_LIMIT
+                    ),
+                    'earning_calendars': (
+                        urls.get_url_earning_calendar, FS_LIMIT + 12
+                    ),
+                },
+                client=client
+            )
+        client.summary.log()
+        return data
+
+    financial_data = asyncio.run(collect())
+
+    is_data = financial_data['income_statements']
     with open(IS_DATA_FILE, 'w') as file:
         json.dump(is_data, file)
 
     logging.info(f'Income Statements: {len(is_data)}')
 
-    bs_data = fin_get.get_raw_financial_data(
-        all_tickers=all_tickers,
-        url_fn=urls.get_url_balance_sheets,
-        fs_limit=FS_LIMIT
-    )
+    bs_data = financial_data['balance_sheets']
     with open(BS_DATA_FILE, 'w') as file:
         json.dump(bs_data, file)
 
     logging.info(f'Balance Sheets: {len(bs_data)}')
 
-    ec_data = fin_get.get_raw_financial_data(
-        all_tickers=all_tickers,
-        url_fn=urls.get_url_earning_calendar,
-        fs_limit=FS_LIMIT + 12
-    )
+    ec_data = financial_data['earning_calendars']
     with open(EC_DATA_FILE, 'w') as file:
         json.dump(ec_data, file)
 
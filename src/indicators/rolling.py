@@ -0,0 +1,99 @@
+from typing import Optional
+from dataclasses import dataclass, field
+import numpy as np
+
+# Rolling means are sums of blocks of period dates: a window is the tail of
+# the previous block plus the head of the current one. Sums never run past
+# a block, so rounding errors do not grow with the number of dates and an
+# inf or huge value only affects windows holding it. Batch functions take
+# dates x tickers (or dates) arrays and updaters advance all tickers by one
+# date, both adding values in the same order so numbers are identical.
+
+
+def _get_window_sums(values: np.ndarray, period: int) -> np.ndarray:
+    """Sums of last period values (less at start) along the first axis."""
+    blocks_count = -(-len(values) // period)
+    blocks = np.zeros((blocks_count * period, *values.shape[1:]))
+    blocks[:len(values)] = values
+    blocks = blocks.reshape(blocks_count, period, *values.shape[1:])
+    # Sums from each block's start and to its end
+    heads = np.cumsum(blocks, axis=1).reshape(-1, *values.shape[1:])
+    tails = (
+        np.cumsum(blocks[:, ::-1], axis=1)[:, ::-1]
+        .reshape(-1, *values.shape[1:])
+    )
+
+    sums = heads[:len(values)].copy()
+    # Windows not ending a block start in the previous one
+    ends = np.arange(period, len(values))
+    ends = ends[ends % period != period - 1]
+    sums[ends] = tails[ends - period + 1] + heads[ends]
+
+    return sums
+
+
+def compute_rolling_mean(
+        values: np.ndarray, period: int, min_periods: Optional[int] = None
+    ) -> np.ndarray:
+    """
+    Mean of non NaN values among last period values along dates (first
+    axis) of values, NaN if there are less than min_periods (default period)
+    of them, as pandas rolling mean.
+    """
+    is_value = ~np.isnan(values)
+    sums = _get_window_sums(np.where(is_value, values, 0), period)
+    counts = _get_window_sums(is_value.astype(np.float64), period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(
+            counts >= (min_periods or period), sums / counts, np.nan
+        )
+
+
+@dataclass
+class RollingMean:
+    """
+    Rolling mean of last period values updated one date at a time
+    (as compute_rolling_mean), for all tickers at once.
+    """
+    period: int
+    shape: tuple[int, ...] = ()
+    min_periods: Optional[int] = None
+    count: int = 0
+    # Values of the current block and sums of their heads, and of the
+    # previous block's tails (from each position to its end)
+    block: np.ndarray = field(init=False)
+    head: np.ndarray = field(init=False)
+    tails: np.ndarray = field(init=False)
+
+    def __post_init__(self) -> None:
+        # Sums of values and of non NaN counts, stacked
+        self.block = np.zeros((self.period, 2, *self.shape))
+        self.head = np.zeros((2, *self.shape))
+        self.tails = np.zeros((self.period, 2, *self.shape))
+
+    def update(self, values: np.ndarray | float) -> np.ndarray:
+        """Add values of the next date, return rolling means."""
+        is_value = ~np.isnan(values)
+        position = self.count % self.period
+        self.block[position] = (
+            np.where(is_value, values, 0), is_value.astype(np.float64)
+        )
+        self.head = (
+            self.block[position].copy() if position == 0
+            else self.head + self.block[position]
+        )
+        self.count += 1
+
+        sums, counts = (
+            self.tails[position + 1] + self.head
+            if self.count > self.period and position != self.period - 1
+            else self.head
+        )
+        if position == self.period - 1:
+            self.tails = np.cumsum(self.block[::-1], axis=0)[::-1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(
+                counts >= (self.min_periods or self.period),
+                sums / counts,
+                np.nan
+            )
@@ -1,5 +1,9 @@
+from typing import Optional
+from dataclasses import dataclass, field
 from math import inf
 import pandas as pd
+import numpy as np
+from indicators.rolling import RollingMean, compute_rolling_mean
 
 
 def compute_rsi_series(prices: pd.Series, period: int) -> pd.Series:
@@ -22,4 +26,59 @@ def compute_rsi(prices: pd.Series, period: int) -> float:
     rs = gain.mean() / loss.mean()
     rsi = 100 - (100 / (1 - rs))
     
-    return rsi
\ No newline at end of file
+    return rsi
+
+
+def _compute_rsi_of_means(
+        gain_mean: np.ndarray, loss_mean: np.ndarray
+    ) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = gain_mean / loss_mean
+        return 100 - (100 / (1 - rs))
+
+
+def compute_rsi_of_matrix(
+        prices: np.ndarray, period: int, min_periods: Optional[int] = None
+    ) -> np.ndarray:
+    """
+    Compute relative strength index (as compute_rsi_series)
+    of dates x tickers prices, of at least min_periods price changes
+    (default period, the first price counts as no change).
+    """
+    delta = np.full(prices.shape, np.nan)
+    delta[1:] = np.diff(prices, axis=0)
+    gain = np.where(delta > 0, delta, 0)
+    loss = np.where(delta < 0, delta, 0)
+
+    return _compute_rsi_of_means(
+        compute_rolling_mean(gain, period, min_periods),
+        compute_rolling_mean(loss, period, min_periods)
+    )
+
+
+@dataclass
+class RsiUpdater:
+    """
+    Relative strength index of tickers' prices advanced one date at a time
+    (as compute_rsi_of_matrix).
+    """
+    period: int
+    shape: tuple[int, ...] = ()
+    min_periods: Optional[int] = None
+    last_prices: np.ndarray = field(init=False)
+    gain: RollingMean = field(init=False)
+    loss: RollingMean = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.last_prices = np.full(self.shape, np.nan)
+        self.gain = RollingMean(self.period, self.shape, self.min_periods)
+        self.loss = RollingMean(self.period, self.shape, self.min_periods)
+
+    def update(self, prices: np.ndarray | float) -> np.ndarray:
+        """Add prices of the next date, return RSI."""
+        delta = prices - self.last_prices
+        self.last_prices = np.full(self.shape, prices, dtype=np.float64)
+        return _compute_rsi_of_means(
+            self.gain.update(np.where(delta > 0, delta, 0)),
+            self.loss.update(np.where(delta < 0, delta, 0))
+        )
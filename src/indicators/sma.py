@@ -1,8 +1,37 @@
+from typing import Optional
+from dataclasses import dataclass, field
 import pandas as pd
+import numpy as np
+from indicators.rolling import RollingMean, compute_rolling_mean
 
 
 def compute_sma(prices: pd.Series, period: int) -> pd.Series:
     """Compute simple moving average."""
     
     return prices.rolling(period).mean()
-    
\ No newline at end of file
+
+
+def compute_sma_of_matrix(
+        prices: np.ndarray, period: int, min_periods: Optional[int] = None
+    ) -> np.ndarray:
+    """
+    Compute simple moving average of dates x tickers prices
+    (of at least min_periods prices, default period).
+    """
+    return compute_rolling_mean(prices, period, min_periods)
+
+
+@dataclass
+class SmaUpdater:
+    """Simple moving average of tickers' prices advanced one date at a time."""
+    period: int
+    shape: tuple[int, ...] = ()
+    min_periods: Optional[int] = None
+    mean: RollingMean = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.mean = RollingMean(self.period, self.shape, self.min_periods)
+
+    def update(self, prices: np.ndarray | float) -> np.ndarray:
+        """Add prices of the next date, return SMA."""
+        return self.mean.update(prices)
@@ -48,6 +48,11 @@ parser.add_argument(
     action='store_true',
     help='check multiple score weights for performance'
 )
+parser.add_argument(
+    '--sweep',
+    action='store_true',
+    help='search score weights, top and fee, backtest the best ones'
+)
 parser.add_argument(
     '--save_backtest',
     action='store_true',
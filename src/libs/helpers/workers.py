@@ -0,0 +1,51 @@
+from typing import Any, Callable, Iterable
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+# Read-only inputs of tasks run by map_with_shared in this process.
+_shared: Any = None
+
+
+def get_shared() -> Any:
+    """Shared inputs given to map_with_shared."""
+    return _shared
+
+
+def _set_shared(shared: Any) -> None:
+    global _shared
+    _shared = shared
+
+
+def map_with_shared(
+        fn: Callable[[Any], Any],
+        items: Iterable[Any],
+        shared: Any,
+        max_workers: int
+    ) -> list[Any]:
+    """
+    fn over items across worker processes, results in items' order. fn
+    gets shared inputs with get_shared(), workers receive them once at
+    start instead of with every item. Workers are forked where available,
+    so inputs are not pickled, but reference counting still copies the
+    memory pages of Python objects workers touch. With one worker (or
+    less) items are processed in this process, which keeps shared inputs
+    only during the call.
+    """
+    if max_workers <= 1:
+        _set_shared(shared)
+        try:
+            return [fn(item) for item in items]
+        finally:
+            _set_shared(None)
+
+    mp_context = (
+        multiprocessing.get_context('fork')
+        if 'fork' in multiprocessing.get_all_start_methods() else None
+    )
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=mp_context,
+        initializer=_set_shared,
+        initargs=(shared,)
+    ) as executor:
+        return list(executor.map(fn, items))
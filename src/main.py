@@ -39,6 +39,14 @@ def main() -> None:
             scenarios = tomllib.load(file)[rank_strategy][scenarios_name]
 
         index.main(scenarios, first_rank_date)
+
+    if args.sweep:
+        from backtests import index, search
+
+        first_rank_date = '2019-12-31'
+
+        best_scenarios, sweep_data = search.main(first_rank_date)
+        index.main(best_scenarios, first_rank_date, sweep_data)
         
 
 if __name__ == '__main__':
@@ -0,0 +1,114 @@
+from typing import Iterable, Literal, Optional, Self
+from dataclasses import dataclass, field
+import datetime
+import pandas as pd
+import numpy as np
+from prices.matrix import PriceMatrix
+
+# Calendar periods: week (from Monday), month, quarter and year.
+Period = Literal['W', 'M', 'Q', 'Y']
+_MONTHS_IN_PERIOD = {'M': 1, 'Q': 3, 'Y': 12}
+
+DateLike = str | datetime.date | pd.Timestamp
+
+
+def _to_day(date: DateLike) -> np.datetime64:
+    return pd.Timestamp(date).to_datetime64().astype('datetime64[D]')
+
+
+def _get_period_codes(days: np.ndarray, period: Period) -> np.ndarray:
+    """Number of the period each day is in (weeks and months since epoch)."""
+    if period == 'W':
+        # 1970-01-01 is Thursday, weeks start on Mondays
+        return (days.astype(np.int64) + 3) // 7
+    months = days.astype('datetime64[M]').astype(np.int64)
+    return months // _MONTHS_IN_PERIOD[period]
+
+
+def _get_period_first_days(codes: np.ndarray, period: Period) -> np.ndarray:
+    """First calendar day of periods of the codes."""
+    if period == 'W':
+        return (codes * 7 - 3).astype('datetime64[D]')
+    months = codes * _MONTHS_IN_PERIOD[period]
+    return months.astype('datetime64[M]').astype('datetime64[D]')
+
+
+@dataclass
+class TradingCalendar:
+    """
+    Sorted trading dates (datetime64[D]) with positions of the first
+    trading date of each week, month, quarter and year. Trading dates
+    within dates and period boundaries are looked up by bisection.
+    """
+    dates: np.ndarray
+    period_starts: dict[Period, np.ndarray] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.period_starts = {}
+        for period in ('W', 'M', 'Q', 'Y'):
+            codes = _get_period_codes(self.dates, period)
+            is_start = np.ones(len(codes), dtype=bool)
+            is_start[1:] = codes[1:] != codes[:-1]
+            self.period_starts[period] = np.flatnonzero(is_start)
+
+    @classmethod
+    def from_dates(cls, dates: Iterable[DateLike]) -> Self:
+        """Create from trading dates in any order."""
+        days = [_to_day(date) for date in dates]
+        return cls(np.unique(np.array(days, dtype='datetime64[D]')))
+
+    @classmethod
+    def from_price_matrix(
+            cls, price_matrix: PriceMatrix, symbol: Optional[str] = None
+        ) -> Self:
+        """Create from all dates of price store or dates of symbol's bars."""
+        days = price_matrix.dates.values.astype('datetime64[D]')
+        if symbol is not None:
+            days = days[price_matrix.has_bar[:, price_matrix.columns[symbol]]]
+        return cls(days)
+
+    def get_bounds(self, start: DateLike, end: DateLike) -> tuple[int, int]:
+        """Positions [first, last + 1) of trading dates within start and end."""
+        return (
+            int(np.searchsorted(self.dates, _to_day(start), side='left')),
+            int(np.searchsorted(self.dates, _to_day(end), side='right'))
+        )
+
+    def get_trading_dates(self, start: DateLike, end: DateLike) -> list[str]:
+        """Trading dates within start and end (inclusive)."""
+        first, last = self.get_bounds(start, end)
+        return self.dates[first:last].astype(str).tolist()
+
+    def get_first_trading_date(
+            self, start: DateLike, end: DateLike
+        ) -> Optional[str]:
+        """First trading date within start and end (None if there is none)."""
+        first, last = self.get_bounds(start, end)
+        return str(self.dates[first]) if first < last else None
+
+    def get_last_trading_date(
+            self, start: DateLike, end: DateLike
+        ) -> Optional[str]:
+        """Last trading date within start and end (None if there is none)."""
+        first, last = self.get_bounds(start, end)
+        return str(self.dates[last - 1]) if first < last else None
+
+    def get_first_trading_dates(
+            self,
+            period: Period,
+            start: Optional[DateLike] = None,
+            end: Optional[DateLike] = None
+        ) -> list[str]:
+        """
+        First trading dates of periods starting on or after start
+        and followed by the next period starting on or before end.
+        """
+        firsts = self.dates[self.period_starts[period]]
+        codes = _get_period_codes(firsts, period)
+        is_selected = np.ones(len(firsts), dtype=bool)
+        if start is not None:
+            is_selected &= _get_period_first_days(codes, period) >= _to_day(start)
+        if end is not None:
+            is_selected &= _get_period_first_days(codes + 1, period) <= _to_day(end)
+
+        return firsts[is_selected].astype(str).tolist()
@@ -1,25 +1,44 @@
 from typing import Iterable
-import sqlite3
+from api.http_get import JSON
+from prices import storage
+from prices.storage import PriceBar
+
+# Benchmark ticker of equal weight index of universe stocks (daily rebalanced).
+EQUAL_WEIGHT = 'EQUAL_WEIGHT'
+
+
+def get_price_tickers(benchmarks: Iterable[str]) -> list[str]:
+    """Tickers of benchmarks with their own prices (not equal weight)."""
+    return [
+        ticker.upper() for ticker in benchmarks
+        if ticker.upper() != EQUAL_WEIGHT
+    ]
+
+
+def get_price_bars(raw_data: JSON | None) -> list[PriceBar]:
+    """Extract daily bars from API historical prices response."""
+    if not raw_data:
+        return []
+    return [
+        (i['date'], i['open'], i['high'], i['low'], i['close'])
+        for i in raw_data.get('historical', [])
+    ]
 
 
 def get_stocks_prices_form_db(
         symbols: Iterable[str], db_file_path: str
         ) -> dict[str, dict[str, dict[str, float | None]]]:
-    connection = sqlite3.connect(db_file_path)
-    cursor = connection.cursor()
-    # print(cur.execute('PRAGMA table_list').fetchall())
+    symbols_by_stored = {
+        storage.get_symbol(symbol): symbol.upper() for symbol in symbols
+    }
+    connection = storage.connect(db_file_path)
     stocks_prices = {}
-    for symbol in symbols:
-        try:
-            row = cursor.execute(
-                f"SELECT date, open, close FROM '{symbol.lower()}' ORDER BY date"
-                ).fetchall()
-            stocks_prices[symbol.upper()] = (
-                {i[0]: {'Open': i[1], 'Close': i[2]} for i in row}
-                )
-        except sqlite3.OperationalError:
-            continue
+    for stored_symbol, date, open_price, close_price in storage.get_prices_rows(
+            connection, symbols_by_stored):
+        symbol = symbols_by_stored[stored_symbol]
+        stocks_prices.setdefault(symbol, {})[date] = (
+            {'Open': open_price, 'Close': close_price}
+        )
     connection.close()
 
     return stocks_prices
-
@@ -1,13 +1,15 @@
 import logging
 import os
 from typing import Iterable
-import logging
+import asyncio
 import datetime
-import sqlite3
 import tomllib
 import json
 from api import http_get, fmp
+from api.http_get import JSON
 from symbols import getters
+from prices import getters as prices_get
+from prices import storage
 
 
 def main() -> None:
@@ -18,18 +20,22 @@ def main() -> None:
     PERIOD_TICKERS_FILE = config['repo_files']['period_tickers']
     DB_FILE = config['repo_files']['db']
     BENCHMARK_TICKER = config['portfolio']['benchmark']
+    EXTRA_BENCHMARKS = config['portfolio']['extra_benchmarks']
     PRICES_WEEKS_DELTA = config['collect']['prices_weeks_delta']
+    IS_PRICES_INCREMENTAL = config['collect']['is_prices_incremental']
 
-    try:
-        os.remove(DB_FILE)
-    except FileNotFoundError:
-        pass
+    if not IS_PRICES_INCREMENTAL:
+        try:
+            os.remove(DB_FILE)
+        except FileNotFoundError:
+            pass
 
     with open(PERIOD_TICKERS_FILE) as file:
         period_tickers: Iterable[str] = (json.load(file))
 
     all_tickers = getters.get_all_ptf_tickers(period_tickers)
     all_tickers.append(BENCHMARK_TICKER.upper())
+    all_tickers.extend(prices_get.get_price_tickers(EXTRA_BENCHMARKS))
 
     start_date = (
         datetime.datetime.strptime(
@@ -40,47 +46,60 @@ def main() -> None:
     start_date = str(start_date.date())
     logging.info(f'prices starting date: {start_date}')
 
-    con = sqlite3.connect(DB_FILE)
-    cur = con.cursor()
+    con = storage.connect(DB_FILE)
+    storage.setup_schema(con)
+
+    # Stored tickers are updated from their last bar, new ones fully loaded.
+    last_bars = storage.get_last_bars(con, all_tickers)
+    logging.info(
+        f'tickers to update: {len(last_bars)}, '
+        f'to load: {len(all_tickers) - len(last_bars)}'
+    )
 
     urls = fmp.EndPoints()
 
-    for tick in all_tickers:
-        raw_data = http_get.http_get_sync(
-            urls.get_url_prices(tick, start_date)
+    async def collect(tickers_start_dates: dict[str, str]) -> list[JSON | None]:
+        async with http_get.HttpClient.from_config(config['collect']) as client:
+            data = await client.get_many(
+                urls.get_url_prices(tick, date)
+                for tick, date in tickers_start_dates.items()
             )
-        if raw_data:
-            ticker = raw_data.get('symbol').replace('.', '-')
-            data = raw_data.get('historical')
+        client.summary.log()
+        return data
+
+    tickers_start_dates = {
+        tick: last_bars[tick][0] if tick in last_bars else start_date
+        for tick in all_tickers
+    }
+    tickers_to_reload = []
+
+    raw_prices = asyncio.run(collect(tickers_start_dates))
+    with con:
+        for tick, raw_data in zip(tickers_start_dates, raw_prices):
+            bars = prices_get.get_price_bars(raw_data)
+            if not bars:
+                continue
+            if tick not in last_bars:
+                storage.replace_ticker_prices(con, tick, bars)
+            elif storage.is_history_changed(last_bars[tick], bars):
+                tickers_to_reload.append(tick)
+            else:
+                storage.upsert_ticker_prices(
+                    con, tick,
+                    [bar for bar in bars if bar[0] > last_bars[tick][0]]
+                )
+
+    # History changed (e.g. split adjustment), full reload needed.
+    if tickers_to_reload:
+        logging.info(f'prices history changed: {tickers_to_reload}')
+        tickers_start_dates = {tick: start_date for tick in tickers_to_reload}
+        raw_prices = asyncio.run(collect(tickers_start_dates))
+        with con:
+            for tick, raw_data in zip(tickers_start_dates, raw_prices):
+                bars = prices_get.get_price_bars(raw_data)
+                if bars:
+                    storage.replace_ticker_prices(con, tick, bars)
 
-        prices_data = [(i['date'], i['open'], i['high'], i['low'], i['close']) for i in data]
-
-        try:
-            cur.execute(f'''
-                        CREATE TABLE IF NOT EXISTS '{ticker.lower()}' (
-                            id INTEGER PRIMARY KEY AUTOINCREMENT,
-                            date DATETIME,
-                            open FLOAT,
-                            high FLOAT,
-                            low FLOAT,
-                            close FLOAT
-                        )''')
-        except sqlite3.OperationalError:
-            logging.warning(ticker)
-            continue
-
-        for row in prices_data:
-            cur.execute(f'''
-                        INSERT INTO '{ticker.lower()}' (date, open, high, low, close)
-                        VALUES {row}''')
-
-        cur.execute(f'''
-                    SELECT date, open, high, low, close
-                    FROM '{ticker.lower()}'
-                    ORDER BY date'''
-                    )
-
-    con.commit()
     con.close()
         
     logging.info('prices saved to database.')
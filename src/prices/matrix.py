@@ -0,0 +1,130 @@
+from typing import Iterable, Self
+from dataclasses import dataclass, field
+from functools import cached_property
+import pandas as pd
+import numpy as np
+from prices import storage
+
+
+@dataclass
+class PriceMatrix:
+    """
+    Dense dates x symbols open and close prices (float64, NaN where
+    the symbol has no bar) sharing one sorted dates index.
+    """
+    dates: pd.DatetimeIndex
+    symbols: tuple[str, ...]
+    open: np.ndarray
+    close: np.ndarray
+    columns: dict[str, int] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.columns = {symbol: n for n, symbol in enumerate(self.symbols)}
+
+    @classmethod
+    def from_rows(
+            cls, rows: Iterable[tuple[str, str, float | None, float | None]]
+        ) -> Self:
+        """Create from (symbol, date, open, close) rows."""
+        rows = list(rows)
+        if not rows:
+            return cls(
+                pd.DatetimeIndex([]), (), np.empty((0, 0)), np.empty((0, 0))
+            )
+        symbols_col, dates_col, open_col, close_col = zip(*rows)
+        # ISO date strings sort chronologically.
+        dates, date_codes = np.unique(np.array(dates_col), return_inverse=True)
+        symbols = tuple(dict.fromkeys(symbols_col))
+        symbol_codes = {symbol: n for n, symbol in enumerate(symbols)}
+        symbol_codes = np.fromiter(
+            (symbol_codes[symbol] for symbol in symbols_col),
+            dtype=np.intp, count=len(rows)
+        )
+        prices = {}
+        for name, values in (('open', open_col), ('close', close_col)):
+            prices[name] = np.full((len(dates), len(symbols)), np.nan)
+            prices[name][date_codes, symbol_codes] = (
+                np.array(values, dtype=np.float64)
+            )
+
+        return cls(
+            dates=pd.DatetimeIndex(dates),
+            symbols=symbols,
+            open=prices['open'],
+            close=prices['close'],
+        )
+
+    @classmethod
+    def from_dict(
+            cls, stocks_prices: dict[str, dict[str, dict[str, float | None]]]
+        ) -> Self:
+        """Create from symbol -> date -> {'Open', 'Close'} dictionary."""
+        return cls.from_rows(
+            (symbol, date, price['Open'], price['Close'])
+            for symbol, symbol_prices in stocks_prices.items()
+            for date, price in symbol_prices.items()
+        )
+
+    @cached_property
+    def date_labels(self) -> pd.Index:
+        """Dates as 'YYYY-MM-DD' strings used as keys across the app."""
+        return pd.Index(self.dates.strftime('%Y-%m-%d'))
+
+    @cached_property
+    def has_bar(self) -> np.ndarray:
+        """Dates x symbols mask of existing bars."""
+        return ~(np.isnan(self.open) & np.isnan(self.close))
+
+    def to_dict(self) -> dict[str, dict[str, dict[str, float | None]]]:
+        """Symbol -> date -> {'Open', 'Close'} dictionary view."""
+        dates = self.date_labels
+        has_bar = self.has_bar
+        stocks_prices = {}
+        for symbol, n in self.columns.items():
+            rows = np.flatnonzero(has_bar[:, n])
+            stocks_prices[symbol] = {
+                dates[i]: {
+                    'Open': None if np.isnan(open_price) else open_price,
+                    'Close': None if np.isnan(close_price) else close_price,
+                } for i, open_price, close_price in zip(
+                    rows,
+                    self.open[rows, n].tolist(),
+                    self.close[rows, n].tolist()
+                )
+            }
+
+        return stocks_prices
+
+    def get_open_prices(self, symbol: str) -> pd.Series:
+        """Open prices of the symbol on its trading dates (date labels)."""
+        n = self.columns[symbol]
+        rows = self.has_bar[:, n]
+        return pd.Series(
+            self.open[rows, n], index=self.date_labels[rows], name=symbol
+        )
+
+    def get_close_prices(self, symbol: str) -> pd.Series:
+        """Close prices of the symbol on its trading dates (date labels)."""
+        n = self.columns[symbol]
+        rows = self.has_bar[:, n]
+        return pd.Series(
+            self.close[rows, n], index=self.date_labels[rows], name=symbol
+        )
+
+
+def get_price_matrix_from_db(
+        symbols: Iterable[str], db_file_path: str
+    ) -> PriceMatrix:
+    """Load open and close prices of symbols straight into PriceMatrix."""
+    symbols_by_stored = {
+        storage.get_symbol(symbol): symbol.upper() for symbol in symbols
+    }
+    connection = storage.connect(db_file_path)
+    matrix = PriceMatrix.from_rows(
+        (symbols_by_stored[stored_symbol], date, open_price, close_price)
+        for stored_symbol, date, open_price, close_price
+        in storage.get_prices_rows(connection, symbols_by_stored)
+    )
+    connection.close()
+
+    return matrix
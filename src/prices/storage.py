@@ -0,0 +1,173 @@
+from typing import Iterable, Iterator
+import logging
+import sqlite3
+
+# Prices bar: (date, open, high, low, close)
+PriceBar = tuple[str, float, float, float, float]
+
+# SQLite limit of host parameters in a single statement is 999 on old builds.
+SYMBOLS_BATCH_SIZE = 900
+
+PRAGMAS = (
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA cache_size = -65536',
+)
+
+
+def get_symbol(ticker: str) -> str:
+    """Symbol under which prices of the ticker are stored."""
+    return ticker.replace('.', '-').upper()
+
+
+def connect(db_file_path: str) -> sqlite3.Connection:
+    """Open prices database."""
+    connection = sqlite3.connect(db_file_path)
+    for pragma in PRAGMAS:
+        connection.execute(pragma)
+
+    return connection
+
+
+def setup_schema(connection: sqlite3.Connection) -> None:
+    """
+    Create prices table and migrate legacy layout into it,
+    before writing prices.
+    """
+    with connection:
+        connection.execute('''
+                           CREATE TABLE IF NOT EXISTS prices (
+                               symbol TEXT NOT NULL,
+                               date TEXT NOT NULL,
+                               open REAL,
+                               high REAL,
+                               low REAL,
+                               close REAL,
+                               PRIMARY KEY (symbol, date)
+                           ) WITHOUT ROWID''')
+        connection.execute(
+            'CREATE INDEX IF NOT EXISTS prices_date_idx ON prices (date)'
+        )
+    migrate_ticker_tables(connection)
+
+
+def migrate_ticker_tables(connection: sqlite3.Connection) -> int:
+    """
+    Move prices from legacy one-table-per-ticker layout
+    into prices table and drop the legacy tables.
+    """
+    tables = [
+        row[0] for row in connection.execute('''
+            SELECT name FROM sqlite_master
+            WHERE type = 'table'
+            AND name != 'prices'
+            AND name NOT LIKE 'sqlite_%'
+            ''')
+    ]
+    with connection:
+        for table in tables:
+            connection.execute(f'''
+                               INSERT OR REPLACE INTO prices
+                               (symbol, date, open, high, low, close)
+                               SELECT ?, date, open, high, low, close
+                               FROM '{table}'
+                               WHERE date IS NOT NULL''', (get_symbol(table),))
+            connection.execute(f"DROP TABLE '{table}'")
+    if tables:
+        logging.info(f'prices of {len(tables)} tickers migrated to prices table.')
+
+    return len(tables)
+
+
+def _batched(symbols: Iterable[str]) -> Iterator[list[str]]:
+    symbols = list(symbols)
+    for n in range(0, len(symbols), SYMBOLS_BATCH_SIZE):
+        yield symbols[n:n + SYMBOLS_BATCH_SIZE]
+
+
+def get_last_bars(
+        connection: sqlite3.Connection, tickers: Iterable[str]
+    ) -> dict[str, PriceBar]:
+    """Latest stored bar of each ticker having prices in database."""
+    tickers_by_symbol = {get_symbol(ticker): ticker for ticker in tickers}
+    last_bars = {}
+    for symbols in _batched(tickers_by_symbol):
+        rows = connection.execute(f'''
+            SELECT p.symbol, p.date, p.open, p.high, p.low, p.close
+            FROM prices p
+            JOIN (
+                SELECT symbol, MAX(date) AS date FROM prices
+                WHERE symbol IN ({', '.join('?' * len(symbols))})
+                GROUP BY symbol
+            ) l ON p.symbol = l.symbol AND p.date = l.date''', symbols)
+        for symbol, *bar in rows:
+            last_bars[tickers_by_symbol[symbol]] = tuple(bar)
+
+    return last_bars
+
+
+def upsert_ticker_prices(
+        connection: sqlite3.Connection, ticker: str, bars: list[PriceBar]
+    ) -> None:
+    """Insert bars replacing already stored ones for the same dates."""
+    symbol = get_symbol(ticker)
+    connection.executemany('''
+                           INSERT INTO prices
+                           (symbol, date, open, high, low, close)
+                           VALUES (?, ?, ?, ?, ?, ?)
+                           ON CONFLICT (symbol, date) DO UPDATE SET
+                               open = excluded.open,
+                               high = excluded.high,
+                               low = excluded.low,
+                               close = excluded.close''',
+                           ((symbol, *bar) for bar in bars))
+
+
+def replace_ticker_prices(
+        connection: sqlite3.Connection, ticker: str, bars: list[PriceBar]
+    ) -> None:
+    """Delete stored prices of the ticker and load full history."""
+    connection.execute(
+        'DELETE FROM prices WHERE symbol = ?', (get_symbol(ticker),)
+    )
+    upsert_ticker_prices(connection, ticker, bars)
+
+
+def get_prices_rows(
+        connection: sqlite3.Connection,
+        symbols: Iterable[str],
+        columns: Iterable[str] = ('date', 'open', 'close')
+    ) -> Iterator[tuple]:
+    """
+    Rows of (symbol, *columns) ordered by symbol and date,
+    one query per batch of symbols.
+    """
+    columns = ', '.join(columns)
+    for batch in _batched(dict.fromkeys(get_symbol(s) for s in symbols)):
+        yield from connection.execute(f'''
+            SELECT symbol, {columns} FROM prices
+            WHERE symbol IN ({', '.join('?' * len(batch))})
+            ORDER BY symbol, date''', batch)
+
+
+def is_history_changed(
+        last_bar: PriceBar,
+        bars: list[PriceBar],
+        rel_tolerance: float = 1e-6
+    ) -> bool:
+    """
+    Check if the stored last bar differs from the freshly pulled one
+    for the same date, e.g. prices got adjusted after a split.
+    """
+    fresh_bar = next((bar for bar in bars if bar[0] == last_bar[0]), None)
+    if fresh_bar is None:
+        return True
+    for stored, fresh in zip(last_bar[1:], fresh_bar[1:]):
+        if stored is None or fresh is None:
+            if stored != fresh:
+                return True
+        elif abs(stored - fresh) > rel_tolerance * max(abs(stored), abs(fresh)):
+            return True
+
+    return False
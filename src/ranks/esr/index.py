@@ -9,7 +9,10 @@ from symbols import cleaners as symb_clean
 from prices import prices
 from financials import cleaners as fin_clean 
 from ranks.esr import processors as rank_proc
-from indicators.rsi import compute_rsi
+from ranks.esr import store as rank_store
+from ranks.esr import reports
+from ranks.esr import updates
+from ranks.esr import technicals
 
 
 def main() -> None:
@@ -27,6 +30,10 @@ def main() -> None:
     SMA_PERIOD_STOCKS = config['rank_input']['sma_stocks']
     RANK_WITH_TECH_INDICATORS = config['rank_input']['with_tech_indicators']
 
+    RANK_INPUT_FORMAT = config['rank_input']['file_format']
+    MAX_WORKERS = config['rank_input']['max_workers']
+    IS_INCREMENTAL = config['rank_input']['is_incremental']
+
     RANK_STRATEGY = config['rank']['strategy']
 
     REPLACEMENT_FREQUENCY = config['replacement']['frequency']
@@ -37,9 +44,9 @@ def main() -> None:
         INTERVAL_FREQ = 'W-FRI'
         RANK_INTERVAL = 'weekly'
     
-    RANK_INPUT_FILE = os.path.join(
+    RANK_INPUT_PATH = os.path.join(
         config['repo_files']['path'],
-        f'rank_input_data_{RANK_STRATEGY}_{RANK_INTERVAL}.json'
+        f'rank_input_data_{RANK_STRATEGY}_{RANK_INTERVAL}'
     )
 
     with open(PERIOD_TICKERS_FILE) as file:
@@ -89,25 +96,85 @@ def main() -> None:
     logging.info(f'first rank date: {rank_dates[-1]}')
     logging.info(f'last rank date: {rank_dates[0]}')
 
-    stock_interval_report_position = rank_proc.create_starting_positions(
+    reports_index = reports.ReportsIndex.from_reports(
         tickers=all_tickers,
         financial_data=stocks_financial_data,
         rank_dates=rank_dates,
         interval_freq=INTERVAL_FREQ
     )
 
-    rank_input_data = rank_proc.process_data_for_ranking(
+    # Settings changing rank input values, any change means full rebuild
+    settings = {
+        'interval_freq': INTERVAL_FREQ,
+        'sma_stocks': SMA_PERIOD_STOCKS,
+        'with_tech_indicators': RANK_WITH_TECH_INDICATORS,
+        'file_format': RANK_INPUT_FORMAT,
+    }
+    inputs_hashes = updates.get_inputs_hashes(
+        period_symbols=period_tickers,
+        stocks_prices=stocks_prices,
+        reports_index=reports_index,
+        prices_windows=updates.get_prices_windows(
+            rank_dates, INTERVAL_FREQ, RANK_WITH_TECH_INDICATORS
+        ),
+        lookback=(
+            technicals.get_lookback(SMA_PERIOD_STOCKS)
+            if RANK_WITH_TECH_INDICATORS else 0
+        )
+    )
+    rank_input_file = (
+        f'{RANK_INPUT_PATH}.json' if RANK_INPUT_FORMAT == 'json'
+        else RANK_INPUT_PATH
+    )
+    manifest = (
+        updates.load_manifest(RANK_INPUT_PATH)
+        if IS_INCREMENTAL and os.path.exists(rank_input_file) else None
+    )
+    update_symbols = updates.get_update_symbols(
         period_symbols=period_tickers,
+        manifest=manifest,
+        settings=settings,
+        inputs_hashes=inputs_hashes
+    )
+    logging.info(
+        f'rank input to compute: {len(update_symbols)} of {len(rank_dates)} '
+        f'rank dates, {sum(map(len, update_symbols.values()))} of '
+        f'{sum(map(len, period_tickers.values()))} stocks\' data.'
+    )
+
+    updated_data = rank_proc.process_data_for_ranking_parallel(
+        period_symbols=update_symbols,
         interval_freq=INTERVAL_FREQ,
         stocks_prices=stocks_prices,
-        stocks_financial_data=stocks_financial_data,
-        stock_interval_report_position=stock_interval_report_position,
+        reports_index=reports_index,
         tickers_sma_periods=SMA_PERIOD_STOCKS,
-        rsi_fn=compute_rsi,
-        with_tech_indicators=RANK_WITH_TECH_INDICATORS
+        with_tech_indicators=RANK_WITH_TECH_INDICATORS,
+        max_workers=MAX_WORKERS
     )
 
-    with open(RANK_INPUT_FILE, 'w') as file:
-        json.dump(rank_input_data, file, indent=4)
+    if update_symbols is period_tickers:
+        rank_input_data = updated_data
+    else:
+        if RANK_INPUT_FORMAT == 'json':
+            with open(rank_input_file) as file:
+                stored_data = json.load(file)
+        else:
+            stored_data = rank_store.load_rank_input_data(rank_input_file)
+        rank_input_data = updates.merge_rank_input(
+            period_symbols=period_tickers,
+            stored_data=stored_data,
+            update_symbols=update_symbols,
+            updated_data=updated_data
+        )
+
+    if RANK_INPUT_FORMAT == 'json':
+        with open(rank_input_file, 'w') as file:
+            json.dump(rank_input_data, file, indent=4)
+    else:
+        rank_store.save_rank_input(rank_input_data, RANK_INPUT_PATH)
+    updates.save_manifest(
+        updates.get_manifest(settings, inputs_hashes),
+        RANK_INPUT_PATH
+    )
 
     logging.info('repo interval data for ranking saved.')
\ No newline at end of file
@@ -1,60 +1,160 @@
+from typing import Iterable
+from dataclasses import dataclass
 import pandas as pd
+import numpy as np
 
+# Leading rank input columns with NaN put to zero before ranking.
+ZERO_FILLED_COLUMNS = 9
 
-def compute_ranked_data(
-        rank_input_data: dict[str, dict[str, dict[str, float]]],
-        score_weights: dict[str, float],
+# Rank layers: metrics ranked and weighted into each of the layer's ranks.
+RANK_LAYERS: dict[str, tuple[str, ...]] = {
+    'eps_rank': ('eps_growth', 'eps_growth_acceleration'),
+    'sales_rank': ('mean_sales_growth', 'sales_growth_acceleration'),
+    'price_rank': ('lq_0_perf', 'lq_1_perf'),
+}
+
+
+@dataclass
+class RankInput:
+    """
+    Rank input data as one long (date, ticker) frame, dates in input order,
+    with ranks of metrics within each date computed once for all weights.
+    """
+    data: pd.DataFrame
+    metrics_ranks: pd.DataFrame
+    date_slices: dict[str, slice]
+    na_option: str = 'keep'
+
+
+def get_rank_input_frame(
+        rank_input_data: dict[str, dict[str, dict[str, float]]]
+    ) -> pd.DataFrame:
+    """Long (date, ticker) float frame of date -> ticker -> metrics dictionary."""
+    data = pd.DataFrame.from_dict(
+        {
+            (date, ticker): metrics
+            for date, stocks_data in rank_input_data.items()
+            for ticker, metrics in stocks_data.items()
+        },
+        orient='index',
+        dtype=np.float64
+    )
+    data.index = pd.MultiIndex.from_tuples(data.index, names=['date', 'ticker'])
+
+    return data
+
+
+def get_rank_input(
+        rank_input_data: dict[str, dict[str, dict[str, float]]] | pd.DataFrame,
         na_option: str = 'keep'
-    ) -> dict:
-    """Rank stocks by intervals data * score weights."""
+    ) -> RankInput:
+    """
+    Create RankInput from date -> ticker -> metrics dictionary
+    or long (date, ticker) frame.
+    """
+    if isinstance(rank_input_data, pd.DataFrame):
+        data = rank_input_data.copy()
+    else:
+        data = get_rank_input_frame(rank_input_data)
 
-    rank_output_data = {}
-    
-    for rank_date, stocks_data in rank_input_data.items():
+    # Not removing NaN values, put zero instead.
+    # Prevents removing stock from ranking if e.g. only one metric is NaN.
+    data.iloc[:, :ZERO_FILLED_COLUMNS] = (
+        data.iloc[:, :ZERO_FILLED_COLUMNS].fillna(0)
+    )
 
-        score = pd.DataFrame(stocks_data).transpose()
+    metrics = [metric for layer in RANK_LAYERS.values() for metric in layer]
+    metrics_ranks = (
+        data.loc[:, metrics]
+        .groupby(level='date', sort=False)
+        .rank(na_option=na_option)
+    )
 
-        # Not removing NaN values, put zero instead.
-        # Prevents removing stock from ranking if e.g. only one metric is NaN.
-        score.iloc[:, :9] = score.iloc[:, :9].fillna(0)
+    dates = data.index.get_level_values('date')
+    starts = [0, *np.flatnonzero(dates[1:] != dates[:-1]) + 1]
+    ends = [*starts[1:], len(dates)]
+    date_slices = {
+        dates[start]: slice(start, end) for start, end in zip(starts, ends)
+    }
 
-        eps_ranking = (
-            score['eps_growth'].rank(na_option=na_option) * score_weights['eps_growth']
-            + score['eps_growth_acceleration'].rank(na_option=na_option) * score_weights['eps_growth_acceleration']
-        ).rank()
-        eps_ranking.name = 'eps_rank'
-        score = score.merge(
-            eps_ranking, how='inner', left_index=True, right_index=True
-        )
+    return RankInput(data, metrics_ranks, date_slices, na_option)
 
-        sales_ranking = (
-            score['mean_sales_growth'].rank(na_option=na_option) * score_weights['mean_sales_growth']
-            + score['sales_growth_acceleration'].rank(na_option=na_option) * score_weights['sales_growth_acceleration']
-        ).rank()
-        sales_ranking.name = 'sales_rank'
-        score = score.merge(
-            sales_ranking, how='inner', left_index=True, right_index=True
-        )
 
-        price_ranking = (
-            score['lq_0_perf'].rank(na_option=na_option) * score_weights['lq_0_perf']
-            + score['lq_1_perf'].rank(na_option=na_option) * score_weights['lq_1_perf']
-        ).rank()
-        price_ranking.name = 'price_rank'
-        score = score.merge(
-            price_ranking, how='inner', left_index=True, right_index=True
-        )
+def _grouped_rank(
+        values: np.ndarray, rank_input: RankInput, na_option: str = 'keep'
+    ) -> np.ndarray:
+    """Rank columns of rows x scenarios values within each date."""
+    return (
+        pd.DataFrame(values, index=rank_input.data.index)
+        .groupby(level='date', sort=False)
+        .rank(na_option=na_option)
+        .to_numpy()
+    )
 
-        ranking = (
-            score['eps_rank'].rank(na_option=na_option) * score_weights['eps_rank']
-            + score['sales_rank'].rank(na_option=na_option) * score_weights['sales_rank']
-            + score['price_rank'].rank(na_option=na_option) * score_weights['price_rank']
-            ).rank(na_option=na_option)
-        ranking.name = 'rank'
-        score = score.merge(
-            ranking, how='inner', left_index=True, right_index=True
+
+def compute_ranks(
+        rank_input: RankInput,
+        scores_weights: Iterable[dict[str, float]]
+    ) -> list[pd.DataFrame]:
+    """
+    Rank stocks by intervals data * score weights for a batch
+    of weights in one pass. Long frames of rank input data
+    with ranks' columns, one per weights.
+    """
+    scores_weights = list(scores_weights)
+    ranks = rank_input.metrics_ranks
+
+    def weights_of(name: str) -> np.ndarray:
+        return np.array([weights[name] for weights in scores_weights])
+
+    layers_ranks = {}
+    for layer, metrics in RANK_LAYERS.items():
+        score = 0
+        for metric in metrics:
+            score = score + (
+                ranks[metric].to_numpy()[:, np.newaxis] * weights_of(metric)
+            )
+        layers_ranks[layer] = _grouped_rank(score, rank_input)
+
+    score = 0
+    for layer, layer_ranks in layers_ranks.items():
+        score = score + (
+            _grouped_rank(layer_ranks, rank_input, rank_input.na_option)
+            * weights_of(layer)
         )
+    final_ranks = _grouped_rank(score, rank_input, rank_input.na_option)
+
+    return [
+        rank_input.data.assign(
+            **{layer: layer_ranks[:, n] for layer, layer_ranks in layers_ranks.items()},
+            rank=final_ranks[:, n]
+        ) for n in range(len(scores_weights))
+    ]
+
+
+def split_by_date(
+        ranked: pd.DataFrame, rank_input: RankInput
+    ) -> dict[str, pd.DataFrame]:
+    """Rank date -> ticker indexed frame of long ranked frame."""
+    ranked_data = {}
+    for date, rows in rank_input.date_slices.items():
+        frame = ranked.iloc[rows].droplevel('date')
+        frame.index.name = None
+        ranked_data[date] = frame
 
-        rank_output_data[rank_date] = score.to_dict()
+    return ranked_data
+
+
+def compute_ranked_data(
+        rank_input_data: dict[str, dict[str, dict[str, float]]] | RankInput,
+        score_weights: dict[str, float],
+        na_option: str = 'keep'
+    ) -> dict[str, pd.DataFrame]:
+    """Rank stocks by intervals data * score weights."""
+    rank_input = (
+        rank_input_data if isinstance(rank_input_data, RankInput)
+        else get_rank_input(rank_input_data, na_option)
+    )
+    ranked = compute_ranks(rank_input, [score_weights])[0]
 
-    return rank_output_data
+    return split_by_date(ranked, rank_input)
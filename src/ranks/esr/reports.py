@@ -0,0 +1,125 @@
+from typing import Iterable, Literal, Self
+from dataclasses import dataclass
+import pandas as pd
+import numpy as np
+
+# Number of reports counted back from the starting position (4 years).
+REPORTS_LOOKBACK = 16
+
+# Report keys: ticker code * _TICKER_SHIFT + _DAY_SHIFT + days since epoch.
+_TICKER_SHIFT = 1 << 32
+_DAY_SHIFT = 1 << 31
+
+
+def get_rank_intervals(
+        rank_dates: Iterable[str],
+        interval_freq: Literal['ME', 'W-FRI']
+    ) -> tuple[np.ndarray, np.ndarray]:
+    """Left and right (days) of (left, right] interval ending on rank dates."""
+    intervals = [
+        pd.interval_range(
+            end=pd.Timestamp(rank_date), periods=1, freq=interval_freq
+        )[0] for rank_date in rank_dates
+    ]
+    lefts = pd.DatetimeIndex([interval.left for interval in intervals])
+    rights = pd.DatetimeIndex([interval.right for interval in intervals])
+
+    return (
+        lefts.values.astype('datetime64[D]').astype(np.int64),
+        rights.values.astype('datetime64[D]').astype(np.int64)
+    )
+
+
+@dataclass
+class ReportsIndex:
+    """
+    Point-in-time index of tickers' financial reports. Holds tickers x rank
+    dates starting positions in tickers' reports lists, from which reports
+    known at the rank date are counted back.
+    """
+    financial_data: dict[str, list[dict[str, str | float]]]
+    tickers: dict[str, int]
+    rank_dates: dict[str, int]
+    positions: np.ndarray
+
+    @classmethod
+    def from_reports(
+            cls,
+            tickers: Iterable[str],
+            financial_data: dict[str, list[dict[str, str | float]]],
+            rank_dates: Iterable[str],
+            interval_freq: Literal['ME', 'W-FRI']
+        ) -> Self:
+        """
+        Position for rank date (in rank dates' order) is the number
+        of previous rank dates' intervals with at least one report.
+        """
+        tickers = [
+            ticker for ticker in dict.fromkeys(tickers)
+            if ticker in financial_data
+        ]
+        rank_dates = list(rank_dates)
+
+        report_codes = [np.empty(0, dtype=np.int64)]
+        report_days = [np.empty(0, dtype=np.int64)]
+        for code, ticker in enumerate(tickers):
+            days = pd.to_datetime(
+                [report['date'] for report in financial_data[ticker]]
+            ).values.astype('datetime64[D]')
+            days = days[~np.isnat(days)]
+            report_codes.append(np.full(len(days), code, dtype=np.int64))
+            report_days.append(days.astype(np.int64))
+        report_keys = np.sort(
+            np.concatenate(report_codes) * _TICKER_SHIFT + _DAY_SHIFT
+            + np.concatenate(report_days)
+        )
+
+        lefts, rights = (
+            get_rank_intervals(rank_dates, interval_freq) if rank_dates
+            else (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+        )
+        tickers_keys = (
+            np.arange(len(tickers), dtype=np.int64)[:, np.newaxis]
+            * _TICKER_SHIFT + _DAY_SHIFT
+        )
+        reports_in_interval = (
+            np.searchsorted(report_keys, tickers_keys + rights, side='right')
+            - np.searchsorted(report_keys, tickers_keys + lefts, side='right')
+        )
+        has_report = reports_in_interval > 0
+        positions = np.cumsum(has_report, axis=1) - has_report
+
+        return cls(
+            financial_data=financial_data,
+            tickers={ticker: n for n, ticker in enumerate(tickers)},
+            rank_dates={rank_date: n for n, rank_date in enumerate(rank_dates)},
+            positions=positions,
+        )
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker in self.tickers and bool(self.rank_dates)
+
+    def get_position(self, ticker: str, rank_date: str) -> int:
+        """Starting position of reports counted back at the rank date."""
+        return int(
+            self.positions[self.tickers[ticker], self.rank_dates[rank_date]]
+        )
+
+    def get_positions(self, ticker: str) -> dict[str, int]:
+        """Rank date -> starting position (empty for ticker not indexed)."""
+        if ticker not in self.tickers:
+            return {}
+        positions = self.positions[self.tickers[ticker]].tolist()
+        return {
+            rank_date: positions[n] for rank_date, n in self.rank_dates.items()
+        }
+
+    def get_reports(
+            self,
+            ticker: str,
+            rank_date: str,
+            number: int = REPORTS_LOOKBACK
+        ) -> list[dict[str, str | float]]:
+        """Reports counted back from the starting position at the rank date."""
+        start = self.get_position(ticker, rank_date)
+        return self.financial_data[ticker][start:start + number]
@@ -1,9 +1,10 @@
 from dataclasses import dataclass
-from typing import Literal
+from typing import Iterable, Literal
 
 import pandas as pd
 import numpy as np
 from scipy import stats
+from prices.calendar import TradingCalendar
 
 
 def compute_quarterly_yoy_growth(
@@ -91,23 +92,158 @@ class GrowthAcceleration:
             return float(np.nan)
 
 
+def get_rs_dates(rank_date: str) -> pd.IntervalIndex:
+    """Month intervals ending the quarters counted back from the rank date."""
+    return pd.interval_range(
+        end=pd.Timestamp(rank_date), periods=13, freq='ME'
+    )[::-3]
+
+
 def compute_period_price_performance(
         prices: dict[str, float],
         rs_dates: pd.IntervalIndex,
-        frequency: str,
+        calendar: TradingCalendar,
         period: Literal[0, 1, 2, 3]) -> float:
     """Computing price performance for the quarter."""
     start = rs_dates[period + 1].right.date()
     end = rs_dates[period].right.date()
-    dates = pd.date_range(start, end, freq=frequency)
-    trading_dates = sorted(
-        set(prices.keys()).intersection(
-            set(str(date.date()) for date in dates)
-            )
-        )
+    first_date = calendar.get_first_trading_date(start, end)
+    last_date = calendar.get_last_trading_date(start, end)
     try:
-        start_price = prices.get(trading_dates[0])['Close']
-        end_price = prices.get(trading_dates[-1])['Close']
+        start_price = prices.get(first_date)['Close']
+        end_price = prices.get(last_date)['Close']
         return end_price / start_price - 1
-    except (IndexError, TypeError, ZeroDivisionError):
+    except (TypeError, ZeroDivisionError):
         return float(np.nan)
+
+
+# Batched kernels: readings of many tickers (or dates x tickers) as matrices
+# with quarters in the last axis, oldest first, left padded with NaN
+# and readings' lengths telling where padding ends.
+
+def get_quarters_matrix(
+        readings: Iterable[Iterable[float | None]], quarters: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+    """Left padded rows x quarters matrix of readings (oldest first), lengths."""
+    readings = [list(row)[-quarters:] for row in readings]
+    matrix = np.full((len(readings), quarters), np.nan)
+    lengths = np.array([len(row) for row in readings], dtype=np.int64)
+    for n, row in enumerate(readings):
+        if row:
+            matrix[n, quarters - len(row):] = np.array(row, dtype=np.float64)
+
+    return matrix, lengths
+
+
+def _is_reading(readings: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Mask of positions not being padding."""
+    positions = np.arange(readings.shape[-1])
+    return positions >= readings.shape[-1] - lengths[..., np.newaxis]
+
+
+def _sum_sequential(readings: np.ndarray, is_included: np.ndarray) -> np.ndarray:
+    """Sum of included readings added one by one, oldest first."""
+    total = np.zeros(readings.shape[:-1])
+    for n in range(readings.shape[-1]):
+        total = total + np.where(is_included[..., n], readings[..., n], 0)
+
+    return total
+
+
+def _sum_compensated(
+        readings: np.ndarray, is_included: np.ndarray
+    ) -> np.ndarray:
+    """
+    Sum of included readings oldest first with Neumaier compensation,
+    as Python's built-in sum of floats does (3.12+).
+    """
+    total = np.zeros(readings.shape[:-1])
+    compensation = np.zeros(readings.shape[:-1])
+    with np.errstate(invalid='ignore'):
+        for n in range(readings.shape[-1]):
+            reading = np.where(is_included[..., n], readings[..., n], 0)
+            new_total = total + reading
+            compensation += np.where(
+                np.abs(total) >= np.abs(reading),
+                (total - new_total) + reading,
+                (reading - new_total) + total
+            )
+            total = new_total
+    is_compensated = (compensation != 0) & np.isfinite(compensation)
+
+    return np.where(is_compensated, total + compensation, total)
+
+
+def compute_eps_growth_batch(
+        eps: np.ndarray, lengths: np.ndarray
+    ) -> np.ndarray:
+    """
+    Growth of last 4 quarters' EPS sum over previous 4 quarters' one
+    (NaN if previous sum is zero or there are no readings).
+    """
+    is_reading = _is_reading(eps, lengths)
+    positions = np.arange(eps.shape[-1])
+    last = positions >= eps.shape[-1] - 4
+    previous = ~last & (positions >= eps.shape[-1] - 8)
+    last_sum = _sum_compensated(eps, is_reading & last)
+    previous_sum = _sum_compensated(eps, is_reading & previous)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = (last_sum - previous_sum) / np.abs(previous_sum)
+
+    return np.where((lengths > 0) & (previous_sum != 0), growth, np.nan)
+
+
+def compute_quarterly_yoy_growth_batch(
+        readings: np.ndarray,
+        lengths: np.ndarray,
+        number_of_last_quarters: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+    """Y/Y growth of last quarters (left padded matrix) and its lengths."""
+    previous = np.full(readings.shape, np.nan)
+    previous[..., 4:] = readings[..., :-4]
+    previous = np.where(
+        _is_reading(readings, np.maximum(lengths - 4, 0)), previous, np.nan
+    )
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = (readings - previous) / np.abs(previous)
+
+    return (
+        growth[..., -number_of_last_quarters:],
+        np.minimum(lengths, number_of_last_quarters)
+    )
+
+
+def compute_mean_growth_batch(
+        growth: np.ndarray, lengths: np.ndarray
+    ) -> np.ndarray:
+    """Mean of growth readings skipping NaN (as pandas, up to 8 readings)."""
+    is_included = _is_reading(growth, lengths) & ~np.isnan(growth)
+    counts = is_included.sum(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = _sum_sequential(growth, is_included) / counts
+
+    return np.where(counts > 0, mean, np.nan)
+
+
+def compute_slope_batch(
+        growth: np.ndarray, lengths: np.ndarray
+    ) -> np.ndarray:
+    """
+    Closed form least squares slope of growth readings over quarters
+    (NaN if any reading is NaN or less than 2 readings).
+    """
+    is_reading = _is_reading(growth, lengths)
+    positions = np.arange(growth.shape[-1], dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_mean = _sum_sequential(
+            np.broadcast_to(positions, growth.shape), is_reading
+        ) / lengths
+        y_mean = _sum_sequential(growth, is_reading) / lengths
+        dx = np.where(is_reading, positions - x_mean[..., np.newaxis], 0)
+        dy = np.where(is_reading, growth - y_mean[..., np.newaxis], 0)
+        slope = (
+            _sum_sequential(dx * dy, is_reading)
+            / _sum_sequential(dx * dx, is_reading)
+        )
+
+    return np.where(lengths > 1, slope, np.nan)
@@ -0,0 +1,89 @@
+from typing import Optional
+import os
+import numpy as np
+import pandas as pd
+from ranks.esr import rank
+
+# Columnar layout of rank input data directory, rows grouped by rank date
+# in input order: rows of dates[n] are offsets[n]:offsets[n + 1].
+DATES_FILE = 'dates.npy'
+OFFSETS_FILE = 'offsets.npy'
+TICKERS_FILE = 'tickers.npy'
+COLUMNS_FILE = 'columns.npy'
+VALUES_FILE = 'values.npy'
+
+
+def save_rank_input(
+        rank_input_data: dict[str, dict[str, dict[str, float]]],
+        path: str
+    ) -> None:
+    """Save date -> ticker -> metrics data as .npy columnar directory."""
+    data = rank.get_rank_input_frame(rank_input_data)
+    dates = np.array(list(rank_input_data), dtype=str)
+    counts = [len(stocks_data) for stocks_data in rank_input_data.values()]
+
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, DATES_FILE), dates)
+    np.save(
+        os.path.join(path, OFFSETS_FILE),
+        np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+    )
+    np.save(
+        os.path.join(path, TICKERS_FILE),
+        np.array(data.index.get_level_values('ticker'), dtype=str)
+    )
+    np.save(os.path.join(path, COLUMNS_FILE), np.array(data.columns, dtype=str))
+    np.save(os.path.join(path, VALUES_FILE), data.to_numpy(dtype=np.float64))
+
+
+def load_rank_input(
+        path: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
+    ) -> pd.DataFrame:
+    """
+    Load long (date, ticker) frame of rank input data saved as .npy
+    directory. Only rows of rank dates within start and end date
+    (inclusive) are read from memory mapped files.
+    """
+    dates = np.load(os.path.join(path, DATES_FILE))
+    offsets = np.load(os.path.join(path, OFFSETS_FILE))
+
+    is_selected = np.ones(len(dates), dtype=bool)
+    if start_date:
+        is_selected &= dates >= start_date
+    if end_date:
+        is_selected &= dates <= end_date
+    selected = np.flatnonzero(is_selected)
+
+    counts = offsets[selected + 1] - offsets[selected]
+    rows = np.repeat(offsets[selected] - np.cumsum(counts) + counts, counts)
+    rows += np.arange(counts.sum())
+
+    tickers = np.load(os.path.join(path, TICKERS_FILE), mmap_mode='r')
+    values = np.load(os.path.join(path, VALUES_FILE), mmap_mode='r')
+    index = pd.MultiIndex.from_arrays(
+        [
+            np.repeat(dates[selected], counts).tolist(),
+            tickers[rows].tolist()
+        ],
+        names=['date', 'ticker']
+    )
+
+    return pd.DataFrame(
+        np.array(values[rows]),
+        index=index,
+        columns=np.load(os.path.join(path, COLUMNS_FILE)).tolist()
+    )
+
+
+def load_rank_input_data(path: str) -> dict[str, dict[str, dict[str, float]]]:
+    """Load .npy directory as date -> ticker -> metrics dictionary."""
+    rank_input_data = {
+        date: {} for date in np.load(os.path.join(path, DATES_FILE)).tolist()
+    }
+    data = load_rank_input(path)
+    for (date, ticker), metrics in zip(data.index, data.to_dict('records')):
+        rank_input_data[date][ticker] = metrics
+
+    return rank_input_data
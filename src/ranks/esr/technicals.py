@@ -0,0 +1,119 @@
+from typing import Iterable, Literal
+import pandas as pd
+import numpy as np
+from indicators.rolling import compute_rolling_mean
+from indicators.rsi import compute_rsi_of_matrix
+
+# Weekly prices are every 5th trading day counted back from the last one.
+WEEK_STRIDE = 5
+SMA_WEEKS = 9
+RSI_WEEKS = 8
+
+
+def get_intervals_bounds(
+        rank_dates: Iterable[str],
+        interval_freq: Literal['ME', 'W-FRI']
+    ) -> dict[str, tuple[str, str, str, str]]:
+    """
+    First and last day of the interval ending on the rank date
+    and of the next one, for each rank date.
+    """
+    bounds = {}
+    for rank_date in rank_dates:
+        current = pd.interval_range(
+            end=pd.Timestamp(rank_date), periods=1, freq=interval_freq
+        )[0]
+        following = pd.interval_range(
+            start=pd.Timestamp(rank_date), periods=1, freq=interval_freq
+        )[0]
+        bounds[rank_date] = tuple(
+            str(day.date()) for day in (
+                current.left, current.right, following.left, following.right
+            )
+        )
+
+    return bounds
+
+
+def get_lookback(sma_periods: int) -> int:
+    """Number of trading days weekly windows reach back from the last one."""
+    return WEEK_STRIDE * (max(SMA_WEEKS, RSI_WEEKS, sma_periods) - 1)
+
+
+def _get_last_positions(
+        dates: np.ndarray, firsts: np.ndarray, lasts: np.ndarray
+    ) -> np.ndarray:
+    """Position of the last date within [first, last] days (-1 if none)."""
+    positions = np.searchsorted(dates, lasts, side='right') - 1
+    is_found = (positions >= 0) & (dates[np.maximum(positions, 0)] >= firsts)
+
+    return np.where(is_found, positions, -1)
+
+
+def _get_weekly_closes(closes: np.ndarray) -> np.ndarray:
+    """
+    Weeks x WEEK_STRIDE closes: weekly closes (dates ascending) ending on
+    any position are the column of its position modulo WEEK_STRIDE.
+    """
+    weekly = np.full(-(-len(closes) // WEEK_STRIDE) * WEEK_STRIDE, np.nan)
+    weekly[:len(closes)] = closes
+
+    return weekly.reshape(-1, WEEK_STRIDE)
+
+
+def compute_technicals(
+        ticker_prices: dict[str, dict[str, float | None]],
+        intervals_bounds: dict[str, tuple[str, str, str, str]],
+        sma_periods: int
+    ) -> dict[str, dict[str, float]]:
+    """
+    Interval returns, weekly SMA, RSI and price below SMA flag
+    of the ticker for all rank dates, from its full prices' history
+    (dates ascending) at once.
+    """
+    dates = np.array(list(ticker_prices), dtype=str)
+    closes = np.array(
+        [price['Close'] for price in ticker_prices.values()], dtype=np.float64
+    )
+    bounds = np.array(list(intervals_bounds.values()), dtype=str).reshape(-1, 4)
+
+    current_lasts = _get_last_positions(dates, bounds[:, 0], bounds[:, 1])
+    next_lasts = _get_last_positions(dates, bounds[:, 2], bounds[:, 3])
+    has_current = current_lasts >= 0
+
+    # Single stock returns from the last close of current to the next interval
+    with np.errstate(divide='ignore', invalid='ignore'):
+        interval_returns = np.where(
+            has_current & (next_lasts >= 0),
+            (closes[next_lasts] - closes[current_lasts]) / closes[current_lasts],
+            np.nan
+        )
+
+    sma = np.full(len(bounds), np.nan)
+    rsi_fast = np.full(len(bounds), np.nan)
+    is_sma_below = np.full(len(bounds), np.nan)
+    lasts = current_lasts[has_current]
+    if len(lasts):
+        weekly = _get_weekly_closes(closes)
+        weeks = (lasts // WEEK_STRIDE, lasts % WEEK_STRIDE)
+        # Means of the weeks with a close, fewer weeks at history's start
+        sma[has_current] = compute_rolling_mean(weekly, SMA_WEEKS, 1)[weeks]
+        rsi_fast[has_current] = compute_rsi_of_matrix(
+            weekly, RSI_WEEKS - 1, 1
+        )[weeks]
+        # Last price below or above its SMA (weekly prices)
+        is_sma_below[has_current] = (
+            weekly[weeks]
+            < compute_rolling_mean(weekly, sma_periods, 1)[weeks]
+        )
+
+    return {
+        rank_date: {
+            'interval_returns': interval_returns[n].item(),
+            'sma': sma[n].item(),
+            'rsi_fast': rsi_fast[n].item(),
+            'is_sma_below': (
+                int(is_sma_below[n]) if has_current[n] else float(np.nan)
+            ),
+        } for n, rank_date in enumerate(intervals_bounds)
+    }
@@ -0,0 +1,195 @@
+from typing import Any, Iterable, Literal, Optional
+import hashlib
+import json
+import os
+import numpy as np
+from ranks.esr import reports, scorings, technicals
+
+# Manifest of rank input build saved next to rank input data.
+MANIFEST_SUFFIX = '_manifest.json'
+# Manifests of other versions (or without one) mean full rebuild.
+MANIFEST_VERSION = 3
+
+
+def get_content_hash(data: Any) -> str:
+    """Hash of JSON serializable data."""
+    return hashlib.sha256(json.dumps(data).encode()).hexdigest()
+
+
+def get_prices_windows(
+        rank_dates: Iterable[str],
+        interval_freq: Literal['ME', 'W-FRI'],
+        with_tech_indicators: bool
+    ) -> dict[str, tuple[str, str, str]]:
+    """
+    Rank date -> first and last day of prices read for the rank date and
+    last day of its interval, from which technicals' weekly windows reach
+    back. Price performance reads the quarters before the rank date,
+    technicals also the next interval (interval returns).
+    """
+    rank_dates = list(rank_dates)
+    intervals_bounds = technicals.get_intervals_bounds(rank_dates, interval_freq)
+    windows = {}
+    for rank_date in rank_dates:
+        rs_dates = scorings.get_rs_dates(rank_date)
+        first_day = str(rs_dates[-1].right.date())
+        last_day = str(rs_dates[0].right.date())
+        interval_last_day = last_day
+        if with_tech_indicators:
+            current_left, current_right, _, following_right = (
+                intervals_bounds[rank_date]
+            )
+            first_day = min(first_day, current_left)
+            last_day = max(last_day, following_right)
+            interval_last_day = current_right
+        windows[rank_date] = (first_day, last_day, interval_last_day)
+
+    return windows
+
+
+def get_inputs_hashes(
+        period_symbols: dict[str, list[str]],
+        stocks_prices: dict[str, dict[str, dict[str, float | None]]],
+        reports_index: reports.ReportsIndex,
+        prices_windows: dict[str, tuple[str, str, str]],
+        lookback: int = 0
+    ) -> dict[str, dict[str, str]]:
+    """
+    Rank date -> ticker -> hash of inputs its rank input data is computed
+    from: prices (dates and closes) within the rank date's prices window,
+    widened by lookback trading days before the last one of its interval,
+    and financial reports known at the rank date.
+    """
+    tickers_rank_dates: dict[str, list[str]] = {}
+    for rank_date, tickers in period_symbols.items():
+        for ticker in dict.fromkeys(tickers):
+            tickers_rank_dates.setdefault(ticker, []).append(rank_date)
+
+    inputs_hashes: dict[str, dict[str, str]] = {
+        rank_date: {} for rank_date in period_symbols
+    }
+    for ticker, rank_dates in tickers_rank_dates.items():
+        ticker_prices = stocks_prices.get(ticker) or {}
+        dates = np.array(list(ticker_prices), dtype=str)
+        closes = np.array(
+            [price['Close'] for price in ticker_prices.values()],
+            dtype=np.float64
+        )
+        windows = np.array(
+            [prices_windows[rank_date] for rank_date in rank_dates], dtype=str
+        ).reshape(-1, 3)
+        firsts = np.minimum(
+            np.searchsorted(dates, windows[:, 0], side='left'),
+            np.searchsorted(dates, windows[:, 2], side='right') - 1 - lookback
+        ).clip(min=0)
+        lasts = np.searchsorted(dates, windows[:, 1], side='right')
+
+        reports_hashes: dict[int, str] = {}
+        for rank_date, first, last in zip(
+                rank_dates, firsts.tolist(), lasts.tolist()
+            ):
+            if ticker in reports_index:
+                position = reports_index.get_position(ticker, rank_date)
+                if position not in reports_hashes:
+                    reports_hashes[position] = get_content_hash(
+                        reports_index.get_reports(ticker, rank_date)
+                    )
+                reports_hash = reports_hashes[position]
+            else:
+                reports_hash = get_content_hash(None)
+
+            content = hashlib.sha256(reports_hash.encode())
+            content.update(dates[first:last].tobytes())
+            content.update(closes[first:last].tobytes())
+            inputs_hashes[rank_date][ticker] = content.hexdigest()
+
+    return inputs_hashes
+
+
+def get_manifest(
+        settings: dict[str, Any],
+        inputs_hashes: dict[str, dict[str, str]]
+    ) -> dict[str, Any]:
+    """
+    Manifest of rank input build: settings and hashes of inputs
+    of each rank date's tickers.
+    """
+    return {
+        'version': MANIFEST_VERSION,
+        'settings': settings,
+        'rank_dates': inputs_hashes,
+    }
+
+
+def load_manifest(path: str) -> Optional[dict[str, Any]]:
+    """Manifest saved with rank input data at path (None if there is none)."""
+    manifest_path = f'{path}{MANIFEST_SUFFIX}'
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as file:
+        return json.load(file)
+
+
+def save_manifest(manifest: dict[str, Any], path: str) -> None:
+    with open(f'{path}{MANIFEST_SUFFIX}', 'w') as file:
+        json.dump(manifest, file)
+
+
+def get_update_symbols(
+        period_symbols: dict[str, list[str]],
+        manifest: Optional[dict[str, Any]],
+        settings: dict[str, Any],
+        inputs_hashes: dict[str, dict[str, str]]
+    ) -> dict[str, list[str]]:
+    """
+    Rank date -> tickers to compute: tickers with inputs changed since
+    previous build (or not in it). All of them without manifest
+    (of this version) or if settings changed.
+    """
+    if (
+        manifest is None
+        or manifest.get('version') != MANIFEST_VERSION
+        or manifest['settings'] != settings
+    ):
+        return period_symbols
+
+    update_symbols = {}
+    for date, tickers in period_symbols.items():
+        previous = manifest['rank_dates'].get(date, {})
+        hashes = inputs_hashes[date]
+        tickers = [
+            ticker for ticker in tickers
+            if previous.get(ticker) != hashes[ticker]
+        ]
+        if tickers:
+            update_symbols[date] = tickers
+
+    return update_symbols
+
+
+def merge_rank_input(
+        period_symbols: dict[str, list[str]],
+        stored_data: dict[str, dict[str, dict[str, float]]],
+        update_symbols: dict[str, list[str]],
+        updated_data: dict[str, dict[str, dict[str, float]]]
+    ) -> dict[str, dict[str, dict[str, float]]]:
+    """
+    Rank input data of stored cells with computed ones put in,
+    rank dates and tickers in period symbols' order.
+    """
+    rank_input_data = {}
+    for date, tickers in period_symbols.items():
+        computed = set(update_symbols.get(date, ()))
+        stocks_data = {}
+        for ticker in tickers:
+            if ticker in stocks_data:
+                continue
+            data = (
+                updated_data[date] if ticker in computed
+                else stored_data.get(date, {})
+            )
+            if ticker in data:
+                stocks_data[ticker] = data[ticker]
+        rank_input_data[date] = stocks_data
+
+    return rank_input_data
@@ -1,5 +1,8 @@
-from typing import Iterable
+from typing import Iterable, Iterator
+from dataclasses import dataclass
+import bisect
 import pandas as pd
+import numpy as np
 from api.http_get import JSON
 
 
@@ -8,6 +11,81 @@ def get_current_index_tickers(constituents: JSON) -> list[str]:
     return [obj.get("symbol") for obj in constituents]
 
 
+# End of the last membership span of current constituents (still members).
+OPEN_END = '9999-12-31'
+
+
+@dataclass
+class IndexMembership:
+    """
+    Symbols' membership spans in the index, [start, end) ISO dates
+    sorted ascending, answering constituents as of a date by bisection.
+    """
+    spans: dict[str, list[tuple[str, str]]]
+
+    def is_member(self, symbol: str, date: str) -> bool:
+        """Symbol in the index on the date."""
+        spans = self.spans.get(symbol, [])
+        n = bisect.bisect_right(spans, (date, OPEN_END)) - 1
+        return n >= 0 and spans[n][0] <= date < spans[n][1]
+
+    def get_constituents(self, date: str) -> list[str]:
+        """Symbols in the index on the date (sorted)."""
+        return sorted(
+            symbol for symbol in self.spans if self.is_member(symbol, date)
+        )
+
+
+def _get_change(record: dict[str, str]) -> tuple[set[str], set[str]]:
+    """
+    Symbols to add and to remove undoing index change record
+    (going backwards in time).
+    """
+    if record.get('addedSecurity') == '' and record.get('removedSecurity') != '':
+        return {record.get('removedTicker')}, set()
+    elif record.get('addedSecurity') != '' and record.get('removedSecurity') == '':
+        return set(), {record.get('symbol')}
+    else:
+        return {record.get('removedTicker')}, {record.get('symbol')}
+
+
+def _sweep_index_changes(
+        current_tickers: Iterable[str],
+        intervals: pd.IntervalIndex,
+        sp500_historical: JSON
+    ) -> Iterator[tuple[pd.Interval, set[str], set[str]]]:
+    """
+    Walk intervals (latest first) and change records sorted once
+    by date, undo the interval's changes in the preceding interval.
+    Yields interval, its symbols and symbols changed since previous one.
+    """
+    records = list(sp500_historical)
+    dates = pd.to_datetime([record.get('date') for record in records]).values
+    order = np.argsort(dates, kind='stable')
+    dates = dates[order]
+
+    tickers = set(current_tickers)
+    to_add_in_prev_interval: set[str] = set()
+    to_remove_in_prev_interval: set[str] = set()
+    for interval in intervals:
+        tickers.difference_update(to_remove_in_prev_interval)
+        tickers.update(to_add_in_prev_interval)
+        changed = to_remove_in_prev_interval | to_add_in_prev_interval
+        to_add_in_prev_interval, to_remove_in_prev_interval = set(), set()
+
+        # Records dated within (left, right] of the interval
+        first, last = np.searchsorted(
+            dates,
+            np.array([interval.left, interval.right], dtype='datetime64[ns]'),
+            side='right'
+        )
+        for n in order[first:last]:
+            to_add, to_remove = _get_change(records[n])
+            to_add_in_prev_interval |= to_add
+            to_remove_in_prev_interval |= to_remove
+        yield interval, tickers, changed
+
+
 def get_index_tickers_for_periods(
         current_tickers: Iterable[str],
         intervals: pd.IntervalIndex,
@@ -18,40 +96,52 @@ def get_index_tickers_for_periods(
     historical symbol changes in the index. Processes symbols
     backwards ie. remove symbol if "newTicker" and add symbol
     if "removedTicker"."""
-    tickers = set(current_tickers.copy())
-    historical_sp500_tickers = {}
-
-    to_add_in_prev_interval = set()
-    to_remove_in_prev_interval = set()
-    
-    for interval in intervals:
-        # shift removing tickers in preceiding month
-        for symb in to_remove_in_prev_interval:
-            tickers.discard(symb)
-        to_remove_in_prev_interval.clear()
-
-        # shift removing tickers in preceiding month
-        for symb in to_add_in_prev_interval:
-            #for obj in sp500_symbol_change:
-                #if obj.get('oldSymbol') == symb:
-                    #print(obj)
-            tickers.add(symb)
-        to_add_in_prev_interval.clear()
-        
-        for record in sp500_historical:
-            if pd.Timestamp(record.get('date')) in interval:
-                if record.get('addedSecurity') == '' and record.get('removedSecurity') != '':
-                    to_add_in_prev_interval.add(record.get('removedTicker'))
-                elif record.get('addedSecurity') != '' and record.get('removedSecurity') == '':
-                    to_remove_in_prev_interval.add(record.get('symbol'))
-                else:
-                    to_add_in_prev_interval.add(record.get('removedTicker'))
-                    to_remove_in_prev_interval.add(record.get('symbol'))
-        historical_sp500_tickers[str(pd.Timestamp(interval.right).date())] = (
-            sorted(tickers).copy()
+    return {
+        str(pd.Timestamp(interval.right).date()): sorted(tickers)
+        for interval, tickers, _ in _sweep_index_changes(
+            current_tickers, intervals, sp500_historical
         )
+    }
+
+
+def get_index_membership(
+        current_tickers: Iterable[str],
+        intervals: pd.IntervalIndex,
+        sp500_historical: JSON
+    ) -> IndexMembership:
+    """
+    Membership spans of symbols in the index over the intervals
+    (latest first, contiguous). Symbols of an interval are members
+    from the day after its left to its right (inclusive), current
+    ones without end.
+    """
+    def next_day(day: pd.Timestamp) -> str:
+        return str((pd.Timestamp(day) + pd.Timedelta(days=1)).date())
+
+    spans: dict[str, list[tuple[str, str]]] = {}
+    ends: dict[str, str] = {}
+    previous = None
+    for interval, tickers, changed in _sweep_index_changes(
+            current_tickers, intervals, sp500_historical
+        ):
+        if previous is None:
+            changed = tickers
+        for symbol in changed:
+            if symbol in tickers and symbol not in ends:
+                ends[symbol] = (
+                    OPEN_END if previous is None else next_day(interval.right)
+                )
+            elif symbol not in tickers and symbol in ends:
+                spans.setdefault(symbol, []).append(
+                    (next_day(previous.left), ends.pop(symbol))
+                )
+        previous = interval
+    for symbol, end in ends.items():
+        spans.setdefault(symbol, []).append((next_day(previous.left), end))
 
-    return historical_sp500_tickers
+    return IndexMembership(
+        {symbol: spans[symbol][::-1] for symbol in sorted(spans)}
+    )
 
 
 def get_all_ptf_tickers(period_tickers: dict[str, Iterable[str]]) -> Iterable[str]:
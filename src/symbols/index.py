@@ -1,9 +1,11 @@
 import logging
+import asyncio
 import datetime
 import tomllib
 import json
 import pandas as pd
 from api import fmp, http_get
+from api.http_get import JSON
 from symbols import getters as symb_proc
 from libs.helpers.interfaces import ReplaceIntervals
 
@@ -22,11 +24,20 @@ def main() -> None:
         INTERVAL_FREQ = 'W-FRI'
     
     PERIOD_TICKERS = config['repo_files']['period_tickers']
+    INDEX_MEMBERSHIP = config['repo_files']['index_membership']
 
     urls = fmp.EndPoints()
 
-    current_index_data  = http_get.http_get_sync(urls.url_index_constituents)
-    historical_index_data = http_get.http_get_sync(urls.url_index_historical)
+    async def collect() -> list[JSON]:
+        async with http_get.HttpClient.from_config(config['collect']) as client:
+            data = await asyncio.gather(
+                client.get(urls.url_index_constituents),
+                client.get(urls.url_index_historical),
+            )
+        client.summary.log()
+        return data
+
+    current_index_data, historical_index_data = asyncio.run(collect())
     
     current_tickers = symb_proc.get_current_index_tickers(current_index_data)
 
@@ -51,6 +62,16 @@ def main() -> None:
         json.dump(period_tickers, file, indent=4)
     logging.info('repo period tickers saved.')
 
+    index_membership = symb_proc.get_index_membership(
+        current_tickers,
+        intervals,
+        historical_index_data,
+    )
+
+    with open(INDEX_MEMBERSHIP, 'w') as file:
+        json.dump(index_membership.spans, file, indent=4)
+    logging.info('repo index membership saved.')
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backtests import benchmark
+from prices import getters as prices_get
+from prices.matrix import PriceMatrix
+
+
+def get_prices() -> PriceMatrix:
+    """
+    Daily prices of an index and stocks: AAA always growing 1%, BBB
+    falling 1% (listed only in January), CCC growing 2% (listed from
+    February, with prices from the start).
+    """
+    days = [
+        str(day.date()) for day in pd.bdate_range('2021-01-04', '2021-03-31')
+    ]
+    growths = {'^GSPC': 1.005, 'AAA': 1.01, 'BBB': 0.99, 'CCC': 1.02}
+    return PriceMatrix.from_dict({
+        symbol: {
+            day: {'Open': growth ** n, 'Close': growth ** n}
+            for n, day in enumerate(days)
+        } for symbol, growth in growths.items()
+    })
+
+
+UNIVERSE = {
+    '2021-03-31': ['AAA', 'CCC'],
+    '2021-02-28': ['AAA', 'CCC'],
+    '2021-01-31': ['AAA', 'BBB'],
+}
+
+
+def test_equal_weight_of_each_dates_universe():
+    prices = get_prices()
+    bench = benchmark.Benchmark(
+        ['^GSPC', 'equal_weight'], '2021-01-04', '2021-03-31', 1000,
+        prices, UNIVERSE
+    )
+
+    levels = bench.open_prices['EQUAL_WEIGHT_open'].to_numpy()
+    dates = bench.open_prices.index
+    # returns of the day after the stock's period last date still count
+    is_january = np.asarray(dates[:-1] <= '2021-01-29')
+    expected_returns = np.where(
+        is_january, (1.01 + 0.99) / 2, (1.01 + 1.02) / 2
+    )
+    assert levels[0] == 1
+    assert np.allclose(levels[1:] / levels[:-1], expected_returns, rtol=1e-12)
+    assert list(bench.nav.columns) == ['^GSPC_nav', 'EQUAL_WEIGHT_nav']
+
+
+def test_equal_weight_needs_universe():
+    bench = benchmark.Benchmark(
+        ['EQUAL_WEIGHT'], '2021-01-04', '2021-03-31', 1000, get_prices()
+    )
+    with pytest.raises(ValueError):
+        bench.nav
+
+
+def test_price_tickers_skip_equal_weight_in_any_case():
+    assert prices_get.get_price_tickers(['^ndx', 'Equal_Weight']) == ['^NDX']
@@ -0,0 +1,49 @@
+import asyncio
+from aiohttp import web
+from api import http_get
+
+
+async def get_from_stub_server(urls: list) -> tuple[list, http_get.HttpClient]:
+    """Get urls' paths from local server (None urls as they are)."""
+    async def handle(request: web.Request) -> web.Response:
+        if request.match_info['symbol'] == 'MALFORMED':
+            return web.Response(text='{"symbol": ')
+        return web.json_response([{'symbol': request.match_info['symbol']}])
+
+    app = web.Application()
+    app.router.add_get('/{symbol}', handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', 0).start()
+    base_url = f'http://127.0.0.1:{runner.addresses[0][1]}'
+    try:
+        async with http_get.HttpClient(max_retries=0) as client:
+            data = await client.get_many([
+                f'{base_url}/{url}' if url is not None else None
+                for url in urls
+            ])
+    finally:
+        await runner.cleanup()
+
+    return data, client
+
+
+def test_get_many_malformed_json_fails_only_its_url():
+    data, client = asyncio.run(
+        get_from_stub_server(['AAA', 'MALFORMED', 'BBB'])
+    )
+
+    assert data == [[{'symbol': 'AAA'}], None, [{'symbol': 'BBB'}]]
+    assert client.summary.succeeded == 2
+    assert [url.rsplit('/', 1)[1] for url in client.summary.failed] == [
+        'MALFORMED'
+    ]
+    assert next(iter(client.summary.failed.values())).startswith('invalid json')
+
+
+def test_get_many_without_url():
+    data, client = asyncio.run(get_from_stub_server(['AAA', None]))
+
+    assert data == [[{'symbol': 'AAA'}], None]
+    assert client.summary.succeeded == 1
+    assert not client.summary.failed
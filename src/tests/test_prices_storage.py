@@ -0,0 +1,51 @@
+import sqlite3
+from prices import matrix, storage
+
+
+def create_legacy_db(db_file_path: str) -> None:
+    """Prices database in legacy one-table-per-ticker layout."""
+    connection = sqlite3.connect(db_file_path)
+    with connection:
+        connection.execute(
+            "CREATE TABLE 'BRK.B' "
+            '(date TEXT, open REAL, high REAL, low REAL, close REAL)'
+        )
+        connection.execute(
+            "INSERT INTO 'BRK.B' VALUES ('2021-01-04', 1.0, 2.0, 0.5, 1.5)"
+        )
+    connection.close()
+
+
+def get_tables(db_file_path: str) -> list[str]:
+    connection = sqlite3.connect(db_file_path)
+    tables = [
+        row[0] for row in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name"
+        )
+    ]
+    connection.close()
+    return tables
+
+
+def test_connect_leaves_schema_as_it_is(tmp_path):
+    db_file_path = str(tmp_path / 'prices.db')
+    create_legacy_db(db_file_path)
+
+    storage.connect(db_file_path).close()
+
+    assert get_tables(db_file_path) == ['BRK.B']
+
+
+def test_setup_schema_migrates_legacy_tables(tmp_path):
+    db_file_path = str(tmp_path / 'prices.db')
+    create_legacy_db(db_file_path)
+
+    connection = storage.connect(db_file_path)
+    storage.setup_schema(connection)
+    connection.close()
+
+    assert get_tables(db_file_path) == ['prices']
+    prices = matrix.get_price_matrix_from_db(['BRK.B'], db_file_path)
+    assert prices.symbols == ('BRK.B',)
+    assert prices.open.tolist() == [[1.0]]
+    assert prices.close.tolist() == [[1.5]]
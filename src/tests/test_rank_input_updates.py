@@ -0,0 +1,132 @@
+import json
+import logging
+import numpy as np
+import pandas as pd
+import pytest
+from ranks.esr import processors, reports, technicals, updates
+
+TICKERS = ['AAA', 'BBB', 'CCC', 'DDD']
+SMA_PERIODS = 10
+
+
+def get_inputs(last_day: str) -> tuple[dict, dict, dict]:
+    """
+    Period symbols (month ends, latest first), daily prices of tickers
+    and their quarterly reports (latest first) until the last day.
+    """
+    rng = np.random.default_rng(0)
+    days = pd.bdate_range('2019-01-01', '2021-12-31')
+    rank_dates = [
+        str(day.date()) for day in pd.date_range('2020-01-31', last_day, freq='ME')
+    ][::-1]
+    period_symbols = {
+        rank_date: TICKERS if int(rank_date[5:7]) % 2 else TICKERS[:3]
+        for rank_date in rank_dates
+    }
+    stocks_prices = {}
+    financial_data = {}
+    for ticker in TICKERS:
+        closes = 50 * np.cumprod(1 + rng.normal(0, 0.02, len(days)))
+        stocks_prices[ticker] = {
+            str(day.date()): {'Open': close, 'Close': close}
+            for day, close in zip(days, closes.tolist())
+            if str(day.date()) <= last_day
+        }
+        financial_data[ticker] = [
+            {
+                'date': str(day.date()),
+                'eps': float(rng.normal(1, 0.3)),
+                'revenue': float(rng.normal(10, 1)),
+            } for day in pd.date_range('2017-01-15', last_day, freq='3MS')[::-1]
+        ]
+
+    return period_symbols, stocks_prices, financial_data
+
+
+def build_rank_input(
+        last_day: str,
+        with_tech_indicators: bool,
+        previous: tuple[dict, dict] | None = None
+    ) -> tuple[dict, dict, dict]:
+    """
+    Rank input data until the last day as --rank_input builds it (on top
+    of previous build's data and manifest), its manifest and rank date
+    -> tickers computed.
+    """
+    period_symbols, stocks_prices, financial_data = get_inputs(last_day)
+    reports_index = reports.ReportsIndex.from_reports(
+        TICKERS, financial_data, period_symbols, 'ME'
+    )
+    settings = {'with_tech_indicators': with_tech_indicators}
+    inputs_hashes = updates.get_inputs_hashes(
+        period_symbols,
+        stocks_prices,
+        reports_index,
+        updates.get_prices_windows(period_symbols, 'ME', with_tech_indicators),
+        technicals.get_lookback(SMA_PERIODS) if with_tech_indicators else 0
+    )
+    stored_data, manifest = previous or ({}, None)
+    update_symbols = updates.get_update_symbols(
+        period_symbols, manifest, settings, inputs_hashes
+    )
+    updated_data = processors.process_data_for_ranking(
+        update_symbols, 'ME', stocks_prices, reports_index,
+        SMA_PERIODS, with_tech_indicators
+    )
+    rank_input_data = updates.merge_rank_input(
+        period_symbols, stored_data, update_symbols, updated_data
+    )
+
+    return (
+        rank_input_data,
+        updates.get_manifest(settings, inputs_hashes),
+        update_symbols
+    )
+
+
+@pytest.mark.parametrize('with_tech_indicators', [False, True])
+def test_new_month_of_bars_recomputes_only_rank_dates_reading_it(with_tech_indicators):
+    logging.disable(logging.WARNING)
+    data, manifest, _ = build_rank_input('2021-05-31', with_tech_indicators)
+    # every ticker gains a month of bars, period tickers a new rank date
+    data, manifest, update_symbols = build_rank_input(
+        '2021-06-30', with_tech_indicators, (data, manifest)
+    )
+    full_data, _, _ = build_rank_input('2021-06-30', with_tech_indicators)
+    logging.disable(logging.NOTSET)
+
+    expected = {'2021-06-30': TICKERS[:3]}
+    if with_tech_indicators:
+        # interval returns of the previous rank date read the new month
+        expected['2021-05-31'] = TICKERS
+    assert update_symbols == expected
+    assert json.dumps(data) == json.dumps(full_data)
+
+
+def test_changed_bar_recomputes_rank_dates_reading_it():
+    logging.disable(logging.WARNING)
+    period_symbols, stocks_prices, financial_data = get_inputs('2021-06-30')
+    reports_index = reports.ReportsIndex.from_reports(
+        TICKERS, financial_data, period_symbols, 'ME'
+    )
+    windows = updates.get_prices_windows(period_symbols, 'ME', False)
+    hashes = updates.get_inputs_hashes(
+        period_symbols, stocks_prices, reports_index, windows
+    )
+    stocks_prices['BBB']['2020-11-16']['Close'] *= 1.01
+    changed_hashes = updates.get_inputs_hashes(
+        period_symbols, stocks_prices, reports_index, windows
+    )
+    logging.disable(logging.NOTSET)
+
+    changed = {
+        rank_date: ticker
+        for rank_date, tickers_hashes in hashes.items()
+        for ticker, content_hash in tickers_hashes.items()
+        if changed_hashes[rank_date][ticker] != content_hash
+    }
+    # price performance reads the year before the rank date
+    assert changed == {
+        rank_date: 'BBB' for rank_date in period_symbols
+        if '2020-11-30' <= rank_date <= '2021-10-31'
+    }
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+from indicators import rolling, rsi, sma
+
+
+def get_prices(dates: int, tickers: int) -> np.ndarray:
+    """Random walk prices with NaN gaps, a ticker starting later."""
+    rng = np.random.default_rng(0)
+    prices = 100 * np.exp(
+        np.cumsum(rng.normal(0, 0.02, (dates, tickers)), axis=0)
+    )
+    prices[rng.random(prices.shape) < 0.01] = np.nan
+    prices[:30, 1] = np.nan
+
+    return prices
+
+
+@pytest.mark.parametrize('period', [1, 9, 14, 200])
+@pytest.mark.parametrize('min_periods', [None, 1])
+def test_updaters_equal_batch(period, min_periods):
+    prices = get_prices(1000, 20)
+    sma_updater = sma.SmaUpdater(period, (20,), min_periods)
+    rsi_updater = rsi.RsiUpdater(period, (20,), min_periods)
+    single_updater = rsi.RsiUpdater(period, min_periods=min_periods)
+
+    updated_sma = np.array([sma_updater.update(row) for row in prices])
+    updated_rsi = np.array([rsi_updater.update(row) for row in prices])
+    updated_single = np.array([single_updater.update(x) for x in prices[:, 1]])
+
+    batch_sma = sma.compute_sma_of_matrix(prices, period, min_periods)
+    batch_rsi = rsi.compute_rsi_of_matrix(prices, period, min_periods)
+    assert np.array_equal(updated_sma, batch_sma, equal_nan=True)
+    assert np.array_equal(updated_rsi, batch_rsi, equal_nan=True)
+    assert np.array_equal(updated_single, batch_rsi[:, 1], equal_nan=True)
+
+    pandas_sma = pd.DataFrame(prices).rolling(period, min_periods).mean()
+    assert np.allclose(batch_sma, pandas_sma, rtol=1e-12, equal_nan=True)
+    if min_periods is None:
+        pandas_rsi = np.column_stack([
+            rsi.compute_rsi_series(pd.Series(prices[:, n]), period)
+            for n in range(20)
+        ])
+        assert np.allclose(batch_rsi, pandas_rsi, rtol=1e-12, equal_nan=True)
+
+
+def test_rolling_mean_after_collapse_of_long_series():
+    rng = np.random.default_rng(0)
+    values = np.concatenate((
+        1e9 + rng.normal(0, 1, 5000), 1e-3 * (1 + rng.random(5000))
+    ))
+
+    means = rolling.compute_rolling_mean(values, 20)
+
+    expected = np.lib.stride_tricks.sliding_window_view(values, 20).mean(axis=1)
+    assert np.allclose(means[19:], expected, rtol=1e-12)
+
+
+def test_inf_only_in_windows_holding_it():
+    values = np.ones(100)
+    values[10] = np.inf
+    mean = rolling.RollingMean(5)
+
+    updated = np.array([mean.update(x) for x in values])
+
+    means = rolling.compute_rolling_mean(values, 5)
+    assert np.array_equal(updated, means, equal_nan=True)
+    assert np.isinf(means[10:15]).all()
+    assert (means[15:] == 1).all() and (means[4:10] == 1).all()
@@ -0,0 +1,371 @@
+from typing import Iterable
+import logging
+import pandas as pd
+import numpy as np
+import pytest
+from prices.matrix import PriceMatrix
+from backtests import simulation
+from backtests.dates.holdings import Holdings
+from backtests.strategies.demo.strategy_plugins import strategy_demo_replace
+
+
+def compute_ptf_performance_loop(
+        stocks_dates_in_ptf: dict[str, Iterable[str]],
+        ptf_dates: list[str],
+        stocks_prices: dict[str, dict[str, dict[str, float]]],
+        first_trading_dates_of_month: list[str],
+        is_rebalanced: bool,
+        transaction_fee: float,
+        init_capital: float,
+    ) -> tuple[pd.DataFrame, ...]:
+    """Per day loop the simulation replaced (reference implementation)."""
+    cap_invested: float = init_capital
+    tickers = []
+    tickers_cap = {}
+    free_cash: float = 0
+    ptf = {}
+    price_in_ptf = {}
+    returns_in_ptf = {}
+    cap_in_ptf = {}
+    share_in_ptf = {}
+
+    for n, date in enumerate(ptf_dates):
+        if n == 0:
+            tickers = sorted([
+                ticker for ticker, dates in stocks_dates_in_ptf.items()
+                if date in dates
+            ])
+            ticker_init_cap = cap_invested / len(tickers)
+            tickers_cap = {
+                ticker: ticker_init_cap - (ticker_init_cap * transaction_fee)
+                for ticker in tickers
+            }
+            price_in_ptf[date] = {
+                f'{ticker}_open': stocks_prices[ticker][date]['Open']
+                for ticker in tickers
+            }
+            returns_in_ptf[date] = {f'{ticker}_ret': 0 for ticker in tickers}
+            cap_in_ptf[date] = {
+                f'{ticker}_cap': cap for ticker, cap in tickers_cap.items()
+            }
+            share_in_ptf[date] = {
+                ticker: cap / cap_invested for ticker, cap in tickers_cap.items()
+            }
+            ptf[date] = {
+                'invested': cap_invested,
+                'returns_on_invested': 0,
+                'free_cash': free_cash,
+                'tickers': tickers,
+                'sell_trans': 0,
+                'buy_trans': len(tickers),
+                'stocks_in_ptf': len(tickers),
+                'replace_trans_costs': cap_invested * transaction_fee,
+                'replace_trans_counts': len(tickers),
+                'bought': tickers,
+            }
+            continue
+
+        tickers_new_cap = {}
+        replace_trans_costs: float = 0
+        replace_trans_count: int = 0
+        tick_price = {}
+        tick_returns = {}
+        for ticker in tickers:
+            start_cap = tickers_cap[ticker]
+            start_price = stocks_prices[ticker][ptf_dates[n - 1]]['Open']
+            try:
+                end_price = stocks_prices[ticker][date]['Open']
+            except KeyError:
+                stop_trans_cost = start_cap * transaction_fee
+                free_cash += start_cap - stop_trans_cost
+                replace_trans_costs += stop_trans_cost
+                replace_trans_count += 1
+                tickers_cap.pop(ticker)
+                continue
+            returns = end_price / start_price - 1
+            tickers_new_cap[ticker] = start_cap + (start_cap * returns)
+            tick_price[f'{ticker}_open'] = end_price
+            tick_returns[f'{ticker}_ret'] = returns
+
+        cap_invested = sum(cap for cap in tickers_new_cap.values())
+        try:
+            returns_invested = (
+                cap_invested / sum(cap for cap in tickers_cap.values()) - 1
+            )
+        except ZeroDivisionError:
+            returns_invested = float(np.nan)
+        tickers_cap = tickers_new_cap
+
+        new_tickers = sorted([
+            ticker for ticker, dates in stocks_dates_in_ptf.items()
+            if date in dates
+        ])
+        tickers_to_sell_released_cap = {}
+        tickers_to_sell = set(tickers).difference(set(new_tickers))
+        tickers_to_buy = set(new_tickers).difference(set(tickers))
+
+        if tickers_to_sell:
+            for ticker in tickers_to_sell:
+                try:
+                    ticker_cap = tickers_cap[ticker]
+                    sell_trans_cost = ticker_cap * transaction_fee
+                    free_cash += ticker_cap - sell_trans_cost
+                except KeyError:
+                    continue
+                try:
+                    tickers_to_sell_released_cap[ticker] = (
+                        (tickers_cap[ticker] - sell_trans_cost) / cap_invested
+                    )
+                except ZeroDivisionError:
+                    tickers_to_sell_released_cap[ticker] = float(np.nan)
+                replace_trans_costs += sell_trans_cost
+                replace_trans_count += 1
+                tickers_cap.pop(ticker)
+            cap_invested = sum(cap for cap in tickers_cap.values())
+
+        if tickers_to_buy:
+            capital_to_invest = free_cash / len(tickers_to_buy)
+            for ticker in tickers_to_buy:
+                buy_trans_cost = capital_to_invest * transaction_fee
+                tickers_cap.update({ticker: capital_to_invest - buy_trans_cost})
+                replace_trans_costs += buy_trans_cost
+                replace_trans_count += 1
+            free_cash = 0
+            cap_invested = sum(cap for cap in tickers_cap.values())
+
+        rebalance_trans_costs: float = 0
+        rebalance_trans_count: int = 0
+        if is_rebalanced and date in first_trading_dates_of_month:
+            ptf_cap = sum(cap for cap in tickers_cap.values())
+            rebalanced_stock_cap = ptf_cap / len(tickers_cap)
+            rebalanced_tickers_cap = {}
+            for ticker, cap in tickers_cap.items():
+                rebalanced_tickers_cap[ticker] = (
+                    rebalanced_stock_cap
+                    - (abs(cap - rebalanced_stock_cap) * transaction_fee)
+                )
+                rebalance_trans_costs += (
+                    abs(cap - rebalanced_stock_cap) * transaction_fee
+                )
+                rebalance_trans_count += 1
+            tickers_cap = rebalanced_tickers_cap
+            cap_invested = sum(cap for cap in tickers_cap.values())
+
+        tickers = new_tickers
+        price_in_ptf[date] = tick_price
+        returns_in_ptf[date] = tick_returns
+        cap_in_ptf[date] = {
+            f'{ticker}_cap': cap for ticker, cap in tickers_cap.items()
+        }
+        try:
+            share_in_ptf[date] = {
+                ticker: cap / cap_invested for ticker, cap in tickers_cap.items()
+            }
+        except ZeroDivisionError:
+            share_in_ptf[date] = {}
+
+        ptf[date] = {
+            'invested': cap_invested,
+            'returns_on_invested': returns_invested,
+            'free_cash': free_cash,
+            'tickers': tickers,
+            'sell_trans': len(tickers_to_sell),
+            'buy_trans': len(tickers_to_buy),
+            'stocks_in_ptf': len(tickers),
+            'replace_trans_costs': replace_trans_costs,
+            'replace_trans_counts': replace_trans_count,
+            'rebal_trans_costs': rebalance_trans_costs,
+            'rebal_trans_counts': rebalance_trans_count,
+            'sold': sorted(tickers_to_sell) if tickers_to_sell else np.nan,
+            'bought': sorted(tickers_to_buy) if tickers_to_buy else np.nan,
+            'to_sell_share': {
+                ticker: f'{share:.1%}'
+                for ticker, share in tickers_to_sell_released_cap.items()
+            } if tickers_to_sell_released_cap else np.nan,
+            'to_sell_average_share': f'{np.average(
+                list(tickers_to_sell_released_cap.values())
+            ):.2%}' if tickers_to_sell_released_cap else np.nan,
+        }
+
+    ptf_df = pd.DataFrame(ptf).transpose()
+    ptf_df['nav'] = ptf_df['invested'] + ptf_df['free_cash']
+    ptf_df = ptf_df.loc[:, [
+        'invested', 'returns_on_invested', 'free_cash', 'nav',
+        'stocks_in_ptf', 'tickers', 'sell_trans', 'buy_trans',
+        'replace_trans_counts', 'replace_trans_costs',
+        'rebal_trans_counts', 'rebal_trans_costs',
+        'sold', 'bought', 'to_sell_share', 'to_sell_average_share',
+    ]]
+
+    return (
+        ptf_df,
+        pd.DataFrame(price_in_ptf).transpose(),
+        pd.DataFrame(returns_in_ptf).transpose(),
+        pd.DataFrame(cap_in_ptf).transpose(),
+        pd.DataFrame(share_in_ptf).transpose(),
+    )
+
+
+def get_backtest_inputs(seed: int) -> tuple[Holdings, PriceMatrix, list[str]]:
+    """
+    Random walk prices of 16 stocks with missing bars and stocks that stop
+    trading, holdings of 6 random stocks each month.
+    """
+    rng = np.random.default_rng(seed)
+    dates = [str(date.date()) for date in pd.bdate_range('2019-01-01', '2020-12-31')]
+    symbols = [f'T{n:02d}' for n in range(16)]
+    rows = []
+    for symbol in symbols:
+        prices = 50 * np.cumprod(1 + rng.normal(0, 0.02, len(dates)))
+        stop = rng.integers(len(dates) // 2, len(dates) * 2)
+        for n, date in enumerate(dates[:stop]):
+            if rng.random() < 0.98:
+                rows.append((symbol, date, float(prices[n]), float(prices[n])))
+    price_matrix = PriceMatrix.from_rows(rows)
+
+    labels = list(price_matrix.date_labels)
+    months = pd.DatetimeIndex(labels).to_period('M')
+    mask = np.zeros((len(labels), len(symbols)), dtype=bool)
+    for month in months.unique():
+        mask[np.ix_(months == month, rng.choice(len(symbols), 6, replace=False))] = True
+    mask &= price_matrix.has_bar[:, [price_matrix.columns[s] for s in symbols]]
+    rows = mask.any(axis=1)
+    holdings = Holdings(
+        dates=[date for date, is_held in zip(labels, rows) if is_held],
+        symbols=tuple(symbols),
+        mask=mask[rows],
+    )
+    first_dates = pd.Series(holdings.dates).groupby(
+        pd.DatetimeIndex(holdings.dates).to_period('M')
+    ).first().tolist()
+
+    return holdings, price_matrix, first_dates
+
+
+def assert_same_values(expected: pd.DataFrame, actual: pd.DataFrame) -> None:
+    """Same numbers (NaN where missing) over both frames' labels."""
+    index = expected.index.union(actual.index)
+    columns = expected.columns.union(actual.columns)
+    np.testing.assert_allclose(
+        actual.reindex(index=index, columns=columns).to_numpy(dtype=float),
+        expected.reindex(index=index, columns=columns).to_numpy(dtype=float),
+        rtol=1e-12, atol=1e-9
+    )
+
+
+@pytest.mark.parametrize('seed', range(1, 9))
+@pytest.mark.parametrize('is_rebalanced', [False, True])
+@pytest.mark.parametrize('transaction_fee', [0.002, 0.0])
+def test_compute_ptf_performance_matches_loop(seed, is_rebalanced, transaction_fee):
+    logging.disable(logging.WARNING)
+    holdings, price_matrix, first_dates = get_backtest_inputs(seed)
+    stocks_dates_in_ptf = {
+        symbol: set(np.asarray(holdings.dates)[holdings.mask[:, n]])
+        for n, symbol in enumerate(holdings.symbols)
+    }
+    expected = compute_ptf_performance_loop(
+        stocks_dates_in_ptf, holdings.dates, price_matrix.to_dict(),
+        first_dates, is_rebalanced, transaction_fee, 1000
+    )
+    ptf, tickers_details, shares = strategy_demo_replace.compute_ptf_performance(
+        holdings, price_matrix, first_dates, is_rebalanced, transaction_fee, 1000
+    ).to_frames()[:3]
+    logging.disable(logging.NOTSET)
+
+    expected_ptf = expected[0]
+    assert list(ptf.columns) == list(expected_ptf.columns)
+    assert list(ptf.index) == list(expected_ptf.index)
+    for column in ptf.columns:
+        if column in ('tickers', 'sold', 'bought'):
+            assert ptf[column].map(repr).tolist() == (
+                expected_ptf[column].map(repr).tolist()
+            ), column
+        elif column == 'to_sell_share':
+            # dictionaries of the loop are in set iteration order
+            assert ptf[column].map(repr).tolist() == expected_ptf[column].map(
+                lambda shares: repr(dict(sorted(shares.items())))
+                if isinstance(shares, dict) else repr(shares)
+            ).tolist()
+        elif column == 'to_sell_average_share':
+            # The loop averaged shares in set iteration order, the
+            # simulation in symbols' order: may differ by the last digit.
+            np.testing.assert_allclose(
+                ptf[column].str.rstrip('%').astype(float),
+                expected_ptf[column].str.rstrip('%').astype(float),
+                atol=0.01 + 1e-9
+            )
+        else:
+            assert_same_values(
+                expected_ptf[[column]], ptf[[column]].astype(float)
+            )
+
+    details = tickers_details.pivot(index='date', columns='ticker')
+    for name, frame, suffix in (
+            ('price', expected[1], '_open'),
+            ('return', expected[2], '_ret'),
+            ('capital', expected[3], '_cap'),
+            ('share', expected[4], ''),
+        ):
+        actual = details[name].rename(columns=lambda ticker: f'{ticker}{suffix}')
+        assert_same_values(frame, actual)
+    assert_same_values(expected[4], shares)
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+@pytest.mark.parametrize('is_rebalanced', [False, True])
+def test_ledger_adds_up_to_summary(seed, is_rebalanced):
+    logging.disable(logging.WARNING)
+    holdings, price_matrix, first_dates = get_backtest_inputs(seed)
+    result = strategy_demo_replace.compute_ptf_performance(
+        holdings, price_matrix, first_dates, is_rebalanced, 0.002, 1000
+    )
+    logging.disable(logging.NOTSET)
+
+    transactions = result.transactions
+    summary = result.summary.fillna(0)
+    is_rebalance = transactions['reason'] == simulation.Reason.REBALANCE
+    for name, rows in (
+            ('replace', transactions[~is_rebalance]),
+            ('rebal', transactions[is_rebalance]),
+        ):
+        fees = np.bincount(
+            rows['date'], weights=rows['fee'], minlength=len(summary)
+        )
+        np.testing.assert_allclose(
+            fees, summary[f'{name}_trans_costs'], rtol=1e-12, atol=1e-12
+        )
+        if name == 'replace':
+            assert np.array_equal(
+                np.bincount(rows['date'], minlength=len(summary)),
+                summary['replace_trans_counts']
+            )
+    assert len(result.get_transactions_table()) == len(transactions)
+
+
+def test_ledger_grows_keeping_transactions():
+    result = simulation.SimulationResult(
+        dates=['2020-01-02', '2020-01-03'], symbols=('AAA', 'BBB', 'CCC'),
+        holdings=np.ones((2, 3), dtype=bool), prices=np.ones((2, 3)),
+        returns=np.zeros((2, 3)), capital=np.ones((2, 3)),
+        shares=np.ones((2, 3)) / 3, summary=pd.DataFrame(),
+        traded_capital=np.full(2, np.nan)
+    )
+    result.add_transactions(
+        0, np.arange(3), simulation.Side.BUY, 10.0, 0.1,
+        simulation.Reason.REPLACE
+    )
+    result.add_transactions(
+        1, np.array([2]), simulation.Side.SELL, np.array([12.0]),
+        np.array([0.2]), simulation.Reason.STOPPED
+    )
+    result.add_transactions(
+        1, np.array([], dtype=int), simulation.Side.SELL, 0.0, 0.0,
+        simulation.Reason.REPLACE
+    )
+
+    assert result.get_transactions_table().values.tolist() == [
+        ['2020-01-02', 'AAA', 'buy', 10.0, 0.1, 'replace'],
+        ['2020-01-02', 'BBB', 'buy', 10.0, 0.1, 'replace'],
+        ['2020-01-02', 'CCC', 'buy', 10.0, 0.1, 'replace'],
+        ['2020-01-03', 'CCC', 'sell', 12.0, 0.2, 'stopped'],
+    ]
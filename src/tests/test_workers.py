@@ -0,0 +1,21 @@
+import pytest
+from libs.helpers import workers
+
+
+def add_shared(item: int) -> int:
+    return item + workers.get_shared()['offset']
+
+
+@pytest.mark.parametrize('max_workers', [1, 3])
+def test_map_with_shared_in_items_order(max_workers):
+    results = workers.map_with_shared(
+        add_shared, range(10), {'offset': 100}, max_workers
+    )
+
+    assert results == list(range(100, 110))
+
+
+def test_map_with_shared_releases_shared_after_serial_run():
+    workers.map_with_shared(add_shared, range(3), {'offset': 100}, 1)
+
+    assert workers.get_shared() is None